@@ -0,0 +1,147 @@
+# micro-benchmark: chapter html cleaning
+#
+# run with
+# python bench/bench_cleaner.py
+#
+# Compares the original strip loop from extract_single_chapter with
+# chapter_cleaner on large <br>-separated chapters, and checks that both
+# produce identical text before timing them.
+#
+# On twkan-style markup the outputs differ on purpose: the cleaner decodes
+# entities (so &nbsp; indents become whitespace and are stripped, &amp; and
+# &lt; become & and <) and drops watermark lines, where the loop passed all
+# of them through to the translator. Those chapters are checked against the
+# loop's output with exactly these changes applied.
+
+import html
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chapter_cleaner import AD_LINE_RE, clean_chapter_html, clean_chapter_html_legacy
+from fake_twkan import chapter_html
+
+SIZES_KB = [25, 50, 100, 200, 400]
+REPEATS = 3
+
+SENTENCES = [
+    '林凡站在山巔，望著遠處翻湧的雲海，心中一片平靜。',
+    '「師兄，宗門大比就要開始了。」少女輕聲說道。',
+    '他體內的真元緩緩運轉，經脈中傳來陣陣暖意。',
+    '這一劍，斬斷了三年來所有的屈辱與不甘。',
+    '長老們面面相覷，誰也沒有想到結果會是這樣。',
+]
+
+
+def original_strip_loop(content_html: str) -> str:
+    """The cleanup as it was written in extract_single_chapter"""
+    text = content_html.replace('<br>', '\n').replace('<br/>', '\n').replace('<br />', '\n')
+    while '<' in text and '>' in text:
+        start = text.find('<')
+        end = text.find('>', start)
+        if end != -1:
+            text = text[:start] + text[end+1:]
+        else:
+            break
+
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    return '\n'.join(lines)
+
+
+def make_chapter(size_kb: int, seed: int = 0) -> str:
+    """Chromium-serialized #txtcontent markup: paragraphs separated by <br><br>,
+    with the inline anti-copy spans and emphasis tags these sites sprinkle in"""
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    while total < size_kb * 1024:
+        sentences = []
+        for _ in range(rng.randint(1, 4)):
+            sentence = rng.choice(SENTENCES)
+            roll = rng.random()
+            if roll < 0.3:
+                sentence = f'<span class="s{rng.randint(0, 9)}">{sentence}</span>'
+            elif roll < 0.4:
+                sentence = f'<i>{sentence}</i>'
+            sentences.append(sentence)
+        paragraph = '    ' + ''.join(sentences)
+        parts.append(paragraph)
+        parts.append('<br><br>')
+        total += len(paragraph.encode('utf-8')) + 8
+    return ''.join(parts)
+
+
+def make_twkan_chapter(size_kb: int, seed: int = 0) -> str:
+    """Chapter markup as bench/fake_twkan.py serves it (&nbsp; indents, inline spans),
+    plus the escaped punctuation and watermark lines real chapters carry"""
+    rng = random.Random(seed)
+    paragraphs = chapter_html(seed, size_kb).split('<br><br>')
+    extras = [
+        '&nbsp;&nbsp;&nbsp;&nbsp;他低聲道：&quot;Tom &amp; Jerry&quot;，&lt;劍譜&gt;就在這裡。',
+        '&nbsp;&nbsp;&nbsp;&nbsp;請記住本站域名：twkan.com',
+        '&nbsp;&nbsp;&nbsp;&nbsp;<span class="s1">台灣小說網</span>&nbsp;最新章節',
+    ]
+    for extra in extras * max(1, size_kb // 25):
+        paragraphs.insert(rng.randint(0, len(paragraphs)), extra)
+    return '<br><br>'.join(paragraphs)
+
+
+def intended_output(loop_text: str) -> str:
+    """The loop's output with the cleaner's deliberate changes: entities decoded, watermarks dropped"""
+    lines = []
+    for line in loop_text.split('\n'):
+        line = html.unescape(line).strip()
+        if line and not AD_LINE_RE.search(line):
+            lines.append(line)
+    return '\n'.join(lines)
+
+
+def make_noise(rng: random.Random, length: int) -> str:
+    alphabet = ['<', '>', '<br>', '<br/>', '<br />', '\n', ' ', 'a', '字', '/', 'p']
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+def best_of(fn, arg) -> float:
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    # the linear legacy mode must agree with the loop on any input, malformed or not
+    rng = random.Random(42)
+    for _ in range(2000):
+        sample = make_noise(rng, rng.randint(0, 60))
+        assert clean_chapter_html_legacy(sample) == original_strip_loop(sample), repr(sample)
+    print("legacy parity: 2000 random inputs ok")
+
+    print(f"{'size':>8} {'loop (ms)':>12} {'cleaner (ms)':>14} {'speedup':>9}")
+    for size_kb in SIZES_KB:
+        chapter = make_chapter(size_kb, seed=size_kb)
+        expected = original_strip_loop(chapter)
+        assert clean_chapter_html(chapter) == expected, f"output differs at {size_kb}KB"
+
+        twkan_chapter = make_twkan_chapter(size_kb, seed=size_kb)
+        loop_text = original_strip_loop(twkan_chapter)
+        cleaned = clean_chapter_html(twkan_chapter)
+        assert cleaned == intended_output(loop_text), f"twkan output differs at {size_kb}KB"
+        # the differences are real on this markup
+        assert '&nbsp;' in loop_text and '&nbsp;' not in cleaned and '\xa0' not in cleaned
+        assert '&amp;' in loop_text and '"Tom & Jerry"，<劍譜>' in cleaned
+        assert 'twkan.com' in loop_text and 'twkan.com' not in cleaned and '台灣小說網' not in cleaned
+
+        loop_time = best_of(original_strip_loop, chapter)
+        cleaner_time = best_of(clean_chapter_html, chapter)
+        print(f"{size_kb:>6}KB {loop_time * 1000:>12.1f} {cleaner_time * 1000:>14.1f} "
+              f"{loop_time / cleaner_time:>8.1f}x")
+    print("twkan markup: entities decoded and watermark lines dropped, otherwise as the loop")
+
+
+if __name__ == '__main__':
+    main()
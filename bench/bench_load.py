@@ -0,0 +1,314 @@
+# load test: /scrape, /extract and /translate against local stand-ins
+#
+# run with
+# python bench/bench_load.py
+# python bench/bench_load.py --scenarios extract,translate --requests 500 --concurrency 32
+# python bench/bench_load.py --json results.json --baseline previous.json
+#
+# Starts the fake twkan site (fake_twkan.py) and the fake OpenAI-compatible
+# LLM (fake_llm.py) on localhost, swaps the app's MongoDB for the in-memory
+# stand-in (fake_mongo.py, needs mongomock), serves the app with uvicorn in
+# this process and drives it over HTTP. Nothing leaves the machine.
+#
+# Reports p50/p95/p99 latency, requests per second, status codes and the
+# peak resident memory of the process while each scenario runs (the app,
+# the stand-ins and the load generator share it; Chromium does not). With
+# --baseline, a p95 or throughput regression beyond --max-regression exits 1.
+#
+# /scrape drives the real Playwright pool, so it needs Chromium installed
+# (playwright install chromium); with --browser-pool-size 0 it is skipped.
+
+import argparse
+import asyncio
+import functools
+import importlib.util
+import json
+import logging
+import os
+import random
+import resource
+import socket
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import httpx
+import uvicorn
+from bson import ObjectId
+
+from chapter_cleaner import clean_chapter_html
+from fake_llm import create_llm_app
+from fake_mongo import FakeMongoClient
+from fake_twkan import chapter_html, chapter_name, create_twkan_app
+
+APP_PATH = os.path.join(ROOT_DIR, "complete-w-glossary-fix.py")
+SCENARIOS = ["extract", "translate", "translate_cached", "scrape"]
+BOOK_ID = "1000"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        # no procfs: fall back to the lifetime peak (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def serve(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+    server.install_signal_handlers = lambda: None
+    server.task = asyncio.create_task(server.serve())
+    while not server.started:
+        if server.task.done():
+            server.task.result()
+        await asyncio.sleep(0.05)
+    return server
+
+
+async def shutdown(server: uvicorn.Server):
+    server.should_exit = True
+    await server.task
+
+
+def load_app(args, twkan_url: str, llm_url: str):
+    """Import the app with its upstreams pointed at the stand-ins."""
+    os.environ.setdefault("MONGODB_URI", "mongodb://127.0.0.1:1")  # never contacted, replaced below
+    os.environ["OPENROUTER_API_KEY"] = "bench"
+    os.environ["LLM_ROUTES"] = json.dumps([{"model": "bench/fake", "base_url": f"{llm_url}/v1"}])
+    os.environ["BROWSER_POOL_SIZE"] = str(args.browser_pool_size)
+    os.environ["TRANSLATION_CHUNK_TOKENS"] = str(args.chunk_tokens)
+
+    spec = importlib.util.spec_from_file_location("novel_reader_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    module.mongo_client = FakeMongoClient(latency=args.mongo_latency)
+    module.db = module.mongo_client["novel-reader"]
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    return module
+
+
+class Scenario:
+    """One endpoint under load: make_request(i) returns the (method, path, kwargs) of request i."""
+
+    def __init__(self, name: str, make_request, warmup: int = 5):
+        self.name = name
+        self.make_request = make_request
+        self.warmup = warmup
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int):
+    for i in range(scenario.warmup):
+        method, path, kwargs = scenario.make_request(-1 - i)
+        await client.request(method, path, **kwargs)
+
+    latencies = []
+    statuses = {}
+    next_index = iter(range(requests))
+    peak_rss = current_rss_mb()
+    sampling = True
+
+    async def sample_memory():
+        nonlocal peak_rss
+        while sampling:
+            peak_rss = max(peak_rss, current_rss_mb())
+            await asyncio.sleep(0.05)
+
+    async def worker():
+        for i in next_index:
+            method, path, kwargs = scenario.make_request(i)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    sampler = asyncio.create_task(sample_memory())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    sampling = False
+    await sampler
+
+    return {
+        "scenario": scenario.name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "rps": requests / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss,
+        "statuses": statuses,
+    }
+
+
+def build_scenarios(args, twkan_url: str, novel_id: str):
+    rng = random.Random(args.seed)
+    book_url = f"{twkan_url}/book/{BOOK_ID}.html"
+
+    def chapter_url(number: int) -> str:
+        return f"{twkan_url}/book/{BOOK_ID}/{number}.html"
+
+    def extract_request(i):
+        # distinct chapters, so single-flight coalescing does not flatter the numbers
+        return "GET", "/extract", {"params": {"url": chapter_url(i % args.chapters + 1)}}
+
+    @functools.lru_cache(maxsize=None)
+    def chapter_text(number: int) -> str:
+        # built once per chapter so the load generator does not steal event loop time mid-run
+        return clean_chapter_html(chapter_html(number, args.chapter_kb))
+
+    def translate_body(number: int, use_cache: bool):
+        return {
+            "text": chapter_text(number),
+            "chapter_name": chapter_name(number),
+            "novel_id": novel_id,
+            "use_cache": use_cache,
+        }
+
+    def translate_request(i):
+        # a fresh source text per request forces an LLM call even with the cache on
+        body = translate_body(i % args.chapters + 1, use_cache=True)
+        body["text"] += f"\n（{i}:{rng.random()}）"
+        return "POST", "/translate", {"json": body}
+
+    def translate_cached_request(i):
+        number = i % args.cached_chapters + 1
+        return "POST", "/translate", {"json": translate_body(number, use_cache=True)}
+
+    def scrape_request(i):
+        return "GET", "/scrape", {"params": {"url": book_url}}
+
+    return {
+        "extract": Scenario("extract", extract_request),
+        "translate": Scenario("translate", translate_request),
+        "translate_cached": Scenario("translate_cached", translate_cached_request, warmup=args.cached_chapters),
+        "scrape": Scenario("scrape", scrape_request, warmup=1),
+    }
+
+
+def compare(results, baseline_path: str, max_regression: float) -> bool:
+    with open(baseline_path) as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+    ok = True
+    for result in results:
+        before = baseline.get(result["scenario"])
+        if not before:
+            continue
+        p95_change = result["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        rps_change = result["rps"] / before["rps"] - 1 if before["rps"] else 0.0
+        regressed = p95_change > max_regression or rps_change < -max_regression
+        ok = ok and not regressed
+        print(f"{result['scenario']:>18}: p95 {p95_change:+.0%}, rps {rps_change:+.0%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+async def main(args):
+    twkan_port, llm_port, app_port = free_port(), free_port(), free_port()
+    twkan_url = f"http://127.0.0.1:{twkan_port}"
+    llm_url = f"http://127.0.0.1:{llm_port}"
+
+    twkan = await serve(create_twkan_app(args.chapters, args.chapter_kb, args.site_latency), twkan_port)
+    llm = await serve(create_llm_app(args.llm_first_token, args.llm_tokens_per_second,
+                                     args.llm_jitter, args.llm_error_rate, args.seed), llm_port)
+    module = load_app(args, twkan_url, llm_url)
+
+    novel_id = ObjectId()
+    await module.db.novels.insert_one({"_id": novel_id, "title": "bench", "glossary": {}, "glossary_version": 0})
+    server = await serve(module.app, app_port)
+
+    results = []
+    scenarios = build_scenarios(args, twkan_url, str(novel_id))
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}", limits=limits,
+                                     timeout=args.timeout) as client:
+            for name in args.scenarios:
+                if name == "scrape" and args.browser_pool_size == 0:
+                    print("scrape: skipped, needs the browser pool (--browser-pool-size > 0)")
+                    continue
+                requests = args.scrape_requests if name == "scrape" else args.requests
+                results.append(await run_scenario(client, scenarios[name], requests, args.concurrency))
+    finally:
+        await shutdown(server)
+        await shutdown(llm)
+        await shutdown(twkan)
+
+    print(f"{'scenario':>18} {'reqs':>6} {'conc':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'rps':>8} {'peak MB':>8}  statuses")
+    for r in results:
+        print(f"{r['scenario']:>18} {r['requests']:>6} {r['concurrency']:>5} {r['p50_ms']:>9.1f} "
+              f"{r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['rps']:>8.1f} {r['peak_rss_mb']:>8.1f}  "
+              f"{json.dumps(r['statuses'])}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+    if args.baseline and not compare(results, args.baseline, args.max_regression):
+        return 1
+    return 0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test the app against local stand-ins")
+    parser.add_argument("--scenarios", default="extract,translate,translate_cached,scrape",
+                        type=lambda value: [s for s in value.split(",") if s])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--scrape-requests", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    # fake twkan
+    parser.add_argument("--chapters", type=int, default=3000, help="catalog size, most of it behind #loadmore")
+    parser.add_argument("--chapter-kb", type=int, default=8)
+    parser.add_argument("--site-latency", type=float, default=0.02)
+    # fake LLM
+    parser.add_argument("--llm-first-token", type=float, default=0.5)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=1000.0)
+    parser.add_argument("--llm-jitter", type=float, default=0.2)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    # app
+    parser.add_argument("--mongo-latency", type=float, default=0.001)
+    parser.add_argument("--browser-pool-size", type=int, default=int(os.getenv("BROWSER_POOL_SIZE", "2")))
+    parser.add_argument("--chunk-tokens", type=int, default=3000)
+    parser.add_argument("--cached-chapters", type=int, default=5)
+    parser.add_argument("--verbose", action="store_true", help="keep the app's INFO logs")
+    # reporting
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results file from an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main(parse_args())))
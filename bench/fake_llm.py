@@ -0,0 +1,139 @@
+# local OpenAI-compatible chat completions server
+#
+# Answers POST /v1/chat/completions in the CHAPTER_TITLE / TRANSLATION /
+# NEW_TERMS format the translation prompt asks for, streamed or not, with a
+# configurable time to first token, generation speed, jitter and error rate.
+# A reasoning phase can precede the answer, streamed as delta.reasoning the
+# way OpenRouter sends the thinking of reasoning models.
+# The "translation" is filler of about the same length as the source, which
+# is all the app's parsing and caching paths care about.
+
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FILLER = ("Lin Fan stood on the peak and looked at the sea of clouds rolling in the distance, "
+          "his heart perfectly calm. ")
+NEW_TERMS = {"林凡": "Lin Fan", "宗門大比": "Sect Grand Competition", "真元": "True Essence"}
+
+_CONTENT_RE = re.compile(r'Chapter Content[^:\n]*:\n(.*?)\n\nPlease translate', re.DOTALL)
+_TITLE_RE = re.compile(r'Chapter Title: (.*)')
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text.encode('utf-8')) // 3)
+
+
+def build_completion(messages) -> str:
+    prompt = messages[-1]["content"] if messages else ""
+    content_match = _CONTENT_RE.search(prompt)
+    source = content_match.group(1) if content_match else prompt
+    title_match = _TITLE_RE.search(prompt)
+
+    paragraphs = []
+    for line in source.split('\n'):
+        if line.strip():
+            # English runs about 2.5 characters per Chinese character
+            length = max(len(line) * 5 // 2, 20)
+            paragraphs.append((FILLER * (length // len(FILLER) + 1))[:length].strip())
+    number = re.search(r'\d+', title_match.group(1)) if title_match else None
+    title = f"Chapter {number.group(0) if number else 1}" if title_match else ""
+    terms = "\n".join(f"{chinese}:{english}" for chinese, english in NEW_TERMS.items() if chinese in source)
+    return f"CHAPTER_TITLE: {title}\nTRANSLATION:\n" + "\n\n".join(paragraphs) + f"\nNEW_TERMS:\n{terms}\n"
+
+
+def split_deltas(text: str, size: int = 16):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def create_llm_app(first_token: float = 0.5, tokens_per_second: float = 400.0, jitter: float = 0.2,
+                   error_rate: float = 0.0, seed: int = 0, reasoning_seconds: float = 0.0) -> FastAPI:
+    """Fake provider: first_token seconds of queueing, then tokens_per_second of output.
+
+    jitter is the relative spread of both, error_rate the share of requests answered with a 503.
+    reasoning_seconds of streamed thinking come between the first token and the answer.
+    """
+    app = FastAPI()
+    rng = random.Random(seed)
+    app.state.requests = 0
+
+    def spread(value: float) -> float:
+        return max(0.0, value * (1 + rng.uniform(-jitter, jitter)))
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        if rng.random() < error_rate:
+            return JSONResponse({"error": {"message": "upstream overloaded", "code": 503}}, status_code=503)
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = body.get("model", "fake")
+        created = int(time.time())
+        text = build_completion(body.get("messages", []))
+        prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in body.get("messages", []))
+        completion_tokens = estimate_tokens(text)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        ttft = spread(first_token)
+        generation = spread(completion_tokens / tokens_per_second)
+
+        if not body.get("stream"):
+            await asyncio.sleep(ttft + reasoning_seconds + generation)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        def chunk(delta, finish_reason=None, chunk_usage=None):
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            if chunk_usage is not None:
+                payload["usage"] = chunk_usage
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        async def stream():
+            await asyncio.sleep(ttft)
+            yield chunk({"role": "assistant", "content": ""})
+            thinking_until = time.monotonic() + reasoning_seconds
+            while time.monotonic() < thinking_until:
+                yield chunk({"reasoning": "Considering the glossary... "})
+                await asyncio.sleep(min(0.25, reasoning_seconds))
+            deltas = split_deltas(text)
+            pause = generation / len(deltas) if deltas else 0
+            for delta in deltas:
+                yield chunk({"content": delta})
+                await asyncio.sleep(pause)
+            yield chunk({}, finish_reason="stop")
+            if include_usage:
+                yield chunk(None, chunk_usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(create_llm_app(), host="127.0.0.1", port=8102)
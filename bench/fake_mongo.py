@@ -0,0 +1,141 @@
+# in-memory MongoDB stand-in
+#
+# Async facade over mongomock (pip install mongomock) with the slice of the
+# pymongo AsyncMongoClient API the app uses. Every call yields to the event
+# loop and can add a fixed latency to stand in for the network round trip.
+
+import asyncio
+
+import mongomock
+from pymongo import ReturnDocument, UpdateOne
+
+
+class AsyncCursor:
+    """Chainable find() cursor that is consumed with async for or to_list()."""
+
+    def __init__(self, collection, cursor):
+        self._collection = collection
+        self._cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def skip(self, count):
+        self._cursor = self._cursor.skip(count)
+        return self
+
+    def limit(self, count):
+        self._cursor = self._cursor.limit(count)
+        return self
+
+    async def to_list(self, length=None):
+        await self._collection._round_trip()
+        docs = list(self._cursor)
+        return docs if length is None else docs[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        await self._collection._round_trip()
+        for doc in self._cursor:
+            yield doc
+
+
+class AsyncCollection:
+    def __init__(self, collection, latency: float):
+        self._collection = collection
+        self._latency = latency
+
+    async def _round_trip(self):
+        await asyncio.sleep(self._latency)
+
+    async def create_index(self, keys, **kwargs):
+        await self._round_trip()
+        # mongomock has no TTL monitor, so expiry is accepted and ignored
+        kwargs.pop("expireAfterSeconds", None)
+        return self._collection.create_index(keys, **kwargs)
+
+    async def find_one(self, *args, **kwargs):
+        await self._round_trip()
+        return self._collection.find_one(*args, **kwargs)
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self, self._collection.find(*args, **kwargs))
+
+    async def find_one_and_update(self, filter, update, projection=None, return_document=ReturnDocument.BEFORE,
+                                  upsert=False, **kwargs):
+        await self._round_trip()
+        return self._collection.find_one_and_update(
+            filter, update, projection=projection, upsert=upsert,
+            return_document=return_document == ReturnDocument.AFTER, **kwargs
+        )
+
+    async def insert_one(self, document, **kwargs):
+        await self._round_trip()
+        return self._collection.insert_one(document, **kwargs)
+
+    async def update_one(self, filter, update, upsert=False, **kwargs):
+        await self._round_trip()
+        return self._collection.update_one(filter, update, upsert=upsert)
+
+    async def update_many(self, filter, update, upsert=False, **kwargs):
+        await self._round_trip()
+        return self._collection.update_many(filter, update, upsert=upsert)
+
+    async def replace_one(self, filter, replacement, upsert=False, **kwargs):
+        await self._round_trip()
+        return self._collection.replace_one(filter, replacement, upsert=upsert)
+
+    async def delete_many(self, filter, **kwargs):
+        await self._round_trip()
+        return self._collection.delete_many(filter)
+
+    async def count_documents(self, filter, limit=None, **kwargs):
+        await self._round_trip()
+        count = self._collection.count_documents(filter)
+        return min(count, limit) if limit else count
+
+    async def bulk_write(self, requests, ordered=True, **kwargs):
+        # mongomock cannot take pymongo 4.x operation objects, so UpdateOne is replayed one by one
+        await self._round_trip()
+        for request in requests:
+            if not isinstance(request, UpdateOne):
+                raise NotImplementedError(f"bulk_write stand-in does not support {type(request).__name__}")
+            self._collection.update_one(request._filter, request._doc, upsert=request._upsert)
+
+    async def aggregate(self, pipeline, **kwargs):
+        await self._round_trip()
+        return AsyncCursor(self, iter(list(self._collection.aggregate(pipeline))))
+
+
+class AsyncDatabase:
+    def __init__(self, database, latency: float):
+        self._database = database
+        self._latency = latency
+        self._collections = {}
+
+    def __getitem__(self, name: str) -> AsyncCollection:
+        if name not in self._collections:
+            self._collections[name] = AsyncCollection(self._database[name], self._latency)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> AsyncCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+
+class FakeMongoClient:
+    """Drop-in for the app's mongo_client; db = client["novel-reader"] as in the app."""
+
+    def __init__(self, latency: float = 0.0):
+        self._client = mongomock.MongoClient()
+        self._latency = latency
+
+    def __getitem__(self, name: str) -> AsyncDatabase:
+        return AsyncDatabase(self._client[name], self._latency)
+
+    async def close(self):
+        pass
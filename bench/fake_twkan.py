@@ -0,0 +1,153 @@
+# local twkan-style novel site
+#
+# Serves a book page, its catalog and chapter pages with the markup the
+# scrapers look for. The catalog renders the first CATALOG_FIRST_PAGE
+# chapters and appends the rest when #loadmore is clicked, like the real
+# site does. Chapters are deterministic per number, so repeated runs
+# extract identical text.
+#
+#   /book/{book_id}.html                book page (div.bookbox)
+#   /book/{book_id}/index.html          catalog (div.catalog / div#allchapter / li[data-num])
+#   /book/{book_id}/catalog.json        remaining chapters fetched by #loadmore
+#   /book/{book_id}/{number}.html       chapter (div#txtcontent)
+
+import asyncio
+import random
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import HTMLResponse, JSONResponse
+
+CATALOG_FIRST_PAGE = 100
+
+SENTENCES = [
+    '林凡站在山巔，望著遠處翻湧的雲海，心中一片平靜。',
+    '「師兄，宗門大比就要開始了。」少女輕聲說道。',
+    '他體內的真元緩緩運轉，經脈中傳來陣陣暖意。',
+    '這一劍，斬斷了三年來所有的屈辱與不甘。',
+    '長老們面面相覷，誰也沒有想到結果會是這樣。',
+]
+
+BOOK_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+<div class="bookbox">
+  <div class="bookimg2"><img src="/static/cover/{book_id}.jpg"></div>
+  <div class="booknav2">
+    <h1><a href="/book/{book_id}.html">{title}</a></h1>
+    <p>作者：<a href="/author/1.html">{author}</a></p>
+    <p>分類：仙俠</p>
+  </div>
+</div>
+</body></html>
+"""
+
+CATALOG_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title} 目錄</title></head>
+<body>
+<div class="catalog"><h3>最新章節</h3><ul>{latest}</ul></div>
+<div class="catalog">
+  <h3>{title} 目錄</h3>
+  <div id="allchapter">
+    <ul id="chapters">{items}</ul>
+    {loadmore}
+  </div>
+</div>
+<script>
+const more = document.getElementById('loadmore');
+if (more) {{
+  more.addEventListener('click', async (event) => {{
+    event.preventDefault();
+    const response = await fetch('/book/{book_id}/catalog.json');
+    const list = document.getElementById('chapters');
+    const items = await response.json();
+    // appended in slices like the real site, so the catalog grows over several frames
+    for (let i = 0; i < items.length; i += 500) {{
+      list.insertAdjacentHTML('beforeend', items.slice(i, i + 500).join(''));
+      await new Promise(resolve => setTimeout(resolve, 20));
+    }}
+    more.remove();
+  }});
+}}
+</script>
+</body></html>
+"""
+
+CHAPTER_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{name}</title></head>
+<body>
+<h1>{name}</h1>
+<div id="txtcontent">{content}</div>
+</body></html>
+"""
+
+
+def chapter_name(number: int) -> str:
+    return f"第{number}章 宗門大比之{number}"
+
+
+def chapter_item(book_id: str, number: int) -> str:
+    return f'<li data-num="{number}"><a href="/book/{book_id}/{number}.html">{chapter_name(number)}</a></li>'
+
+
+def chapter_html(number: int, size_kb: int) -> str:
+    """<br>-separated paragraphs with the inline spans real chapters carry"""
+    rng = random.Random(number)
+    parts = []
+    total = 0
+    while total < size_kb * 1024:
+        sentences = []
+        for _ in range(rng.randint(1, 4)):
+            sentence = rng.choice(SENTENCES)
+            if rng.random() < 0.3:
+                sentence = f'<span class="s{rng.randint(0, 9)}">{sentence}</span>'
+            sentences.append(sentence)
+        paragraph = '&nbsp;&nbsp;&nbsp;&nbsp;' + ''.join(sentences)
+        parts.append(paragraph + '<br><br>')
+        total += len(paragraph.encode('utf-8')) + 8
+    return ''.join(parts)
+
+
+def create_twkan_app(chapters: int = 3000, chapter_kb: int = 8, latency: float = 0.0) -> FastAPI:
+    """Site with one catalog of `chapters` chapters; every response waits `latency` seconds"""
+    app = FastAPI()
+    title = "劍道獨尊"
+    author = "劍遊太虛"
+
+    async def respond(body: str) -> HTMLResponse:
+        if latency:
+            await asyncio.sleep(latency)
+        return HTMLResponse(body)
+
+    @app.get("/book/{book_id}.html")
+    async def book(book_id: str):
+        return await respond(BOOK_PAGE.format(book_id=book_id, title=title, author=author))
+
+    @app.get("/book/{book_id}/index.html")
+    async def catalog(book_id: str):
+        first = min(chapters, CATALOG_FIRST_PAGE)
+        latest = ''.join(chapter_item(book_id, n) for n in range(chapters, max(chapters - 10, 0), -1))
+        items = ''.join(chapter_item(book_id, n) for n in range(1, first + 1))
+        loadmore = '<a id="loadmore" class="btn more-btn" href="#">載入更多</a>' if chapters > first else ''
+        return await respond(CATALOG_PAGE.format(
+            book_id=book_id, title=title, latest=latest, items=items, loadmore=loadmore
+        ))
+
+    @app.get("/book/{book_id}/catalog.json")
+    async def catalog_rest(book_id: str):
+        if latency:
+            await asyncio.sleep(latency)
+        first = min(chapters, CATALOG_FIRST_PAGE)
+        return JSONResponse([chapter_item(book_id, n) for n in range(first + 1, chapters + 1)])
+
+    @app.get("/book/{book_id}/{number}.html")
+    async def chapter(book_id: str, number: int):
+        if not 1 <= number <= chapters:
+            raise HTTPException(status_code=404)
+        return await respond(CHAPTER_PAGE.format(name=chapter_name(number), content=chapter_html(number, chapter_kb)))
+
+    return app
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(create_twkan_app(), host="127.0.0.1", port=8101)
@@ -0,0 +1,101 @@
+# chapter html -> paragraph text
+#
+# Every tag is visited once by a single regex scan, so cleaning is linear in
+# the size of the chapter (the old strip loop rebuilt the string per tag).
+
+import html
+import re
+
+# same "<...>" boundaries the old strip loop used: a '<' up to the next '>'
+_TAG_RE = re.compile(r'<([^>]*)>')
+_TAG_NAME_RE = re.compile(r'\s*(/?)\s*([a-zA-Z][a-zA-Z0-9]*)')
+
+# elements that start a new paragraph when opened or closed
+BLOCK_TAGS = frozenset({
+    'p', 'div', 'section', 'article', 'blockquote', 'li', 'ul', 'ol',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'tr', 'table', 'hr', 'pre',
+})
+
+# elements whose text is never chapter content
+SKIP_TAGS = frozenset({'script', 'style', 'noscript', 'template'})
+
+# site watermarks and "remember our domain" lines injected into chapters
+AD_LINE_RE = re.compile(
+    r'twkan\.com|台灣小說網|台湾小说网|天天看小說|請記住本站|请记住本站|'
+    r'記住網址|记住网址|手機版閱讀網址|手机版阅读网址|本章未完，請點擊下一頁'
+)
+
+
+_STRIP, _BREAK, _OPEN_SKIP, _CLOSE_SKIP = range(4)
+
+# chapters repeat a handful of distinct tags, so the classification is memoized
+_TAG_ACTIONS = {}
+_TAG_ACTIONS_MAX = 4096
+
+
+def _classify_tag(raw: str):
+    name_match = _TAG_NAME_RE.match(raw)
+    if not name_match:
+        # comments, doctypes, stray "<" - stripped like any other tag
+        return _STRIP, None
+    closing = name_match.group(1) == '/'
+    name = name_match.group(2).lower()
+    if name in SKIP_TAGS:
+        if closing:
+            return _CLOSE_SKIP, name
+        return (_STRIP, None) if raw.rstrip().endswith('/') else (_OPEN_SKIP, name)
+    if name == 'br' or name in BLOCK_TAGS:
+        return _BREAK, name
+    return _STRIP, name
+
+
+def clean_chapter_html_legacy(content_html: str) -> str:
+    """Output of the original br-replace + strip loop, computed in linear time"""
+    text = content_html.replace('<br>', '\n').replace('<br/>', '\n').replace('<br />', '\n')
+    text = _TAG_RE.sub('', text)
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    return '\n'.join(lines)
+
+
+def clean_chapter_html(content_html: str) -> str:
+    """Turn the inner HTML of a chapter container into normalized paragraph text
+
+    <br> variants and block elements become line breaks, script/style bodies
+    are dropped, entities are decoded and ad/watermark lines are removed.
+    On plain <br>-separated chapters the result matches clean_chapter_html_legacy.
+    """
+    parts = []
+    skipping = None
+    pos = 0
+
+    for match in _TAG_RE.finditer(content_html):
+        if skipping is None and match.start() > pos:
+            segment = content_html[pos:match.start()]
+            parts.append(html.unescape(segment) if '&' in segment else segment)
+        pos = match.end()
+
+        raw = match.group(1)
+        action = _TAG_ACTIONS.get(raw)
+        if action is None:
+            action = _classify_tag(raw)
+            if len(_TAG_ACTIONS) < _TAG_ACTIONS_MAX:
+                _TAG_ACTIONS[raw] = action
+        kind, name = action
+
+        if skipping is not None:
+            if kind == _CLOSE_SKIP and name == skipping:
+                skipping = None
+        elif kind == _BREAK:
+            parts.append('\n')
+        elif kind == _OPEN_SKIP:
+            skipping = name
+
+    if skipping is None and pos < len(content_html):
+        parts.append(html.unescape(content_html[pos:]))
+
+    lines = []
+    for line in ''.join(parts).split('\n'):
+        line = line.strip()
+        if line and not AD_LINE_RE.search(line):
+            lines.append(line)
+    return '\n'.join(lines)
@@ -3,49 +3,624 @@
 # uvicorn ex-nov-dtl-api:app --host 0.0.0.0 --port 8000 --reload
 
 import logging
-from fastapi import FastAPI, Query, Body, HTTPException, Request
+from fastapi import FastAPI, Query, Body, HTTPException, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse, StreamingResponse
-from playwright.sync_api import sync_playwright
-from urllib.parse import urljoin
+from playwright.async_api import async_playwright, Error as PlaywrightError
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from contextvars import Context, ContextVar
+from urllib.parse import urljoin, urlparse
 from pydantic import BaseModel
-from openai import OpenAI
-from typing import Dict, Any, Optional
-from pymongo import MongoClient
+from openai import AsyncOpenAI, APIConnectionError, APIStatusError, APITimeoutError
+from typing import Dict, Any, List, Optional
+from pymongo import AsyncMongoClient, ReturnDocument, UpdateOne
+from collections import OrderedDict
+from datetime import datetime, timezone
 from bson import ObjectId
+from bs4 import BeautifulSoup
+from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from chapter_cleaner import clean_chapter_html
+from glossary_matcher import GlossaryMatcher
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+import httpx
+import asyncio
+import functools
+import hashlib
 import time
+import uuid
 import uvicorn
 import json
 import os
 import re
 
-app = FastAPI()
+# -----------------------------
+# METRICS
+# -----------------------------
+# seconds, from sub-millisecond html cleaning up to multi-minute LLM completions
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+LOG_TRACE_IDS = os.getenv("LOG_TRACE_IDS", "1") == "1"
+
+REQUEST_SECONDS = Histogram(
+    "novel_reader_request_seconds", "HTTP request latency", ["method", "route", "status"], buckets=STAGE_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    "novel_reader_stage_seconds", "Time spent in one pipeline stage", ["stage"], buckets=STAGE_BUCKETS
+)
+STAGE_ERRORS = Counter("novel_reader_stage_errors_total", "Pipeline stages that raised", ["stage"])
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    "novel_reader_llm_first_token_seconds", "LLM time to first token", ["route"], buckets=STAGE_BUCKETS
+)
+LLM_COMPLETION_SECONDS = Histogram(
+    "novel_reader_llm_completion_seconds", "LLM time to the end of the completion", ["route"], buckets=STAGE_BUCKETS
+)
+LLM_REQUESTS = Counter("novel_reader_llm_requests_total", "Upstream LLM requests by outcome", ["route", "outcome"])
+LLM_TOKENS = Counter("novel_reader_llm_tokens_total", "Tokens reported by the LLM provider", ["route", "kind"])
+PROMPT_TOKENS = Counter(
+    "novel_reader_prompt_tokens_total", "Estimated input tokens of assembled prompts", ["part"]
+)
+
+# set per request by the trace middleware; background jobs run without them
+trace_id_var: ContextVar[str] = ContextVar("trace_id", default="-")
+stage_timings_var: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+
+class TraceIdFilter(logging.Filter):
+    """Stamp every log record with the trace id of the request that produced it."""
+
+    def filter(self, record):
+        record.trace_id = trace_id_var.get()
+        return True
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    timings = stage_timings_var.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Time a block, awaits included, as one pipeline stage."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+# -----------------------------
+# BROWSER POOL
+# -----------------------------
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+BROWSER_CONTEXT_MAX_PAGES = int(os.getenv("BROWSER_CONTEXT_MAX_PAGES", "50"))
+BROWSER_HEALTH_CHECK_INTERVAL = float(os.getenv("BROWSER_HEALTH_CHECK_INTERVAL", "30"))
+
+BROWSER_LAUNCH_ARGS = [
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-features=VizDisplayCompositor',
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+    '--disable-component-extensions-with-background-pages',
+    '--disable-default-apps',
+    '--disable-extensions',
+    '--disable-translate',
+    '--disable-features=TranslateUI',
+    '--mute-audio',
+    '--window-size=1920,1080'
+]
+
+BROWSER_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+BROWSER_EXTRA_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'zh-TW,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+STEALTH_INIT_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+    Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]});
+    Object.defineProperty(navigator, 'languages', {get: () => ['zh-TW', 'zh', 'en-US', 'en']});
+    delete navigator.__proto__.webdriver;
+"""
+
+
+class BrowserSlot:
+    """One warm browser with a stealth context that is reused across requests."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.browser = None
+        self.context = None
+        self.pages_served = 0
+        self.healthy = False
+
+    async def open(self, playwright):
+        if self.browser is None or not self.browser.is_connected():
+            with stage_timer("browser_launch"):
+                self.browser = await playwright.chromium.launch(headless=True, args=BROWSER_LAUNCH_ARGS)
+        self.context = await self.browser.new_context(
+            viewport={'width': 1920, 'height': 1080},
+            user_agent=BROWSER_USER_AGENT,
+            extra_http_headers=BROWSER_EXTRA_HEADERS,
+        )
+        # stealth setup runs once per context, every page opened from it inherits it
+        await self.context.add_init_script(STEALTH_INIT_SCRIPT)
+        self.pages_served = 0
+        self.healthy = True
+
+    async def close(self, close_browser: bool = False):
+        self.healthy = False
+        try:
+            if self.context:
+                await self.context.close()
+        except PlaywrightError:
+            pass
+        self.context = None
+        if close_browser and self.browser:
+            try:
+                await self.browser.close()
+            except PlaywrightError:
+                pass
+            self.browser = None
+
+
+class BrowserPool:
+    """Pool of warm Chromium browsers/contexts, started once in the app lifespan."""
+
+    def __init__(self, size: int = BROWSER_POOL_SIZE, max_pages: int = BROWSER_CONTEXT_MAX_PAGES,
+                 health_check_interval: float = BROWSER_HEALTH_CHECK_INTERVAL):
+        self.size = size
+        self.max_pages = max_pages
+        self.health_check_interval = health_check_interval
+        self._playwright = None
+        self._slots = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._health_task = None
+
+    async def start(self):
+        self._playwright = await async_playwright().start()
+        self._idle = asyncio.Queue()
+        for i in range(self.size):
+            slot = BrowserSlot(i)
+            await slot.open(self._playwright)
+            self._slots.append(slot)
+            self._idle.put_nowait(slot)
+        self._health_task = asyncio.create_task(self._health_loop())
+        logging.info(f"[BROWSER POOL] Started {self.size} browser(s)")
+
+    async def stop(self):
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+        for slot in self._slots:
+            await slot.close(close_browser=True)
+        self._slots = []
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+        logging.info("[BROWSER POOL] Stopped")
+
+    async def _recycle(self, slot: BrowserSlot, reason: str):
+        logging.info(f"[BROWSER POOL] Recycling slot {slot.index} ({reason})")
+        browser_dead = slot.browser is None or not slot.browser.is_connected()
+        await slot.close(close_browser=browser_dead)
+        await slot.open(self._playwright)
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            for slot in self._slots:
+                if slot.browser is None or not slot.browser.is_connected():
+                    # idle slots are repaired on their next checkout
+                    slot.healthy = False
+
+    @asynccontextmanager
+    async def page(self):
+        """Check out a context from the pool and yield a fresh page on it."""
+        if self._idle is None:
+            raise RuntimeError("Browser pool is not started")
+
+        slot = await self._idle.get()
+        page = None
+        crashed = False
+        try:
+            if not slot.healthy or slot.browser is None or not slot.browser.is_connected():
+                await self._recycle(slot, "unhealthy")
+
+            page = await slot.context.new_page()
+
+            def _on_crash(_):
+                nonlocal crashed
+                crashed = True
+
+            page.on("crash", _on_crash)
+            yield page
+        except PlaywrightError:
+            if slot.browser is None or not slot.browser.is_connected():
+                crashed = True
+            raise
+        finally:
+            try:
+                if page and not page.is_closed():
+                    await page.close()
+            except PlaywrightError:
+                crashed = True
+            slot.pages_served += 1
+            try:
+                if crashed:
+                    await self._recycle(slot, "crash")
+                elif slot.pages_served >= self.max_pages:
+                    await self._recycle(slot, f"served {slot.pages_served} pages")
+            except Exception as e:
+                logging.error(f"[BROWSER POOL] Failed to recycle slot {slot.index}: {e}")
+                slot.healthy = False
+            self._idle.put_nowait(slot)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize() if self._idle else 0,
+            "slots": [
+                {"index": s.index, "healthy": s.healthy, "pages_served": s.pages_served}
+                for s in self._slots
+            ],
+        }
+
+
+browser_pool = BrowserPool()
+
+# -----------------------------
+# HTTP FAST PATH
+# -----------------------------
+EXTRACT_HTTP_FIRST = os.getenv("EXTRACT_HTTP_FIRST", "1") == "1"
+HTTP_FETCH_TIMEOUT = float(os.getenv("HTTP_FETCH_TIMEOUT", "15"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+CHAPTER_MIN_CONTENT_LENGTH = 50
+
+CHAPTER_CONTENT_SELECTORS = [
+    '#txtcontent', '.content', '.chapter-content',
+    '.txt-content', '[class*="content"]', '[id*="content"]'
+]
+
+# markers of anti-bot interstitials that only a real browser gets through
+CHALLENGE_MARKERS = (
+    'cf-chl', 'challenge-platform', 'cf-browser-verification',
+    '<title>Just a moment', 'Attention Required! | Cloudflare',
+)
+
+http_client: Optional[httpx.AsyncClient] = None
+
+
+class FetchStats:
+    """Counts how often the HTTP fast path serves a chapter without the browser"""
+
+    def __init__(self):
+        self.http_hits = 0
+        self.browser_fallbacks = 0
+        self.fallback_reasons: Dict[str, int] = {}
+
+    def record_hit(self):
+        self.http_hits += 1
+
+    def record_fallback(self, reason: str):
+        self.browser_fallbacks += 1
+        self.fallback_reasons[reason] = self.fallback_reasons.get(reason, 0) + 1
+
+    def hit_rate(self) -> float:
+        total = self.http_hits + self.browser_fallbacks
+        return self.http_hits / total if total else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "http_hits": self.http_hits,
+            "browser_fallbacks": self.browser_fallbacks,
+            "hit_rate": round(self.hit_rate(), 4),
+            "fallback_reasons": dict(self.fallback_reasons),
+        }
+
+
+fetch_stats = FetchStats()
+
+
+def create_http_client() -> httpx.AsyncClient:
+    # same identity as the browser contexts; httpx negotiates its own encodings
+    headers = {k: v for k, v in BROWSER_EXTRA_HEADERS.items() if k != 'Accept-Encoding'}
+    headers['User-Agent'] = BROWSER_USER_AGENT
+    return httpx.AsyncClient(
+        headers=headers,
+        timeout=HTTP_FETCH_TIMEOUT,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS),
+    )
+
+
+# -----------------------------
+# ADMISSION CONTROL
+# -----------------------------
+BROWSER_ADMISSION_CONCURRENCY = int(os.getenv("BROWSER_ADMISSION_CONCURRENCY", str(BROWSER_POOL_SIZE * 2)))
+BROWSER_ADMISSION_QUEUE = int(os.getenv("BROWSER_ADMISSION_QUEUE", "20"))
+BROWSER_ADMISSION_TIMEOUT = float(os.getenv("BROWSER_ADMISSION_TIMEOUT", "30"))
+LLM_ADMISSION_CONCURRENCY = int(os.getenv("LLM_ADMISSION_CONCURRENCY", os.getenv("LLM_MAX_CONCURRENCY", "8")))
+LLM_ADMISSION_QUEUE = int(os.getenv("LLM_ADMISSION_QUEUE", "16"))
+LLM_ADMISSION_TIMEOUT = float(os.getenv("LLM_ADMISSION_TIMEOUT", "60"))
+
+
+class SingleFlight:
+    """Concurrent callers with the same key share one in-flight call."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved when every caller went away
+
+    async def do(self, key: str, fn):
+        task = self._calls.get(key)
+        if task is None:
+            # the call runs as its own task so one caller disconnecting does not cancel it for the rest
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            logging.info(f"[{self.name.upper()}] Joined in-flight request")
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._calls), "started": self.started, "coalesced": self.coalesced}
+
+
+class AdmissionGate:
+    """Bounded concurrency plus a bounded wait queue for one stage.
+
+    Requests beyond the queue, or that wait longer than the queue timeout, are
+    rejected with 429 and a Retry-After estimated from recent service times.
+    """
+
+    def __init__(self, name: str, concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.avg_service = 1.0
+
+    def retry_after(self) -> int:
+        backlog = (self.waiting + self.active) / max(1, self.concurrency)
+        return max(1, int(backlog * self.avg_service + 0.5))
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        logging.info(f"[ADMISSION] {self.name} rejected a request ({reason}; waiting={self.waiting}, active={self.active})")
+        raise HTTPException(
+            status_code=429,
+            detail=f"{self.name} stage is saturated, retry later",
+            headers={"Retry-After": str(self.retry_after())}
+        )
+
+    def check(self):
+        """Reject right away if a new request could not even queue."""
+        if self.active + self.waiting >= self.concurrency + self.max_queue:
+            self._reject("queue full")
+
+    async def acquire(self) -> float:
+        self.check()
+        self.waiting += 1
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject("queue timeout")
+        finally:
+            self.waiting -= 1
+        waited = time.monotonic() - start
+        self.admitted += 1
+        self.active += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return time.monotonic()
+
+    def release(self, admitted_at: float):
+        self.active -= 1
+        self._slots.release()
+        # exponentially weighted so Retry-After follows the current upstream speed
+        self.avg_service = 0.8 * self.avg_service + 0.2 * (time.monotonic() - admitted_at)
+
+    @asynccontextmanager
+    async def admit(self):
+        admitted_at = await self.acquire()
+        try:
+            yield
+        finally:
+            self.release(admitted_at)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_seconds": round(self.total_wait / self.admitted, 4) if self.admitted else 0.0,
+            "max_wait_seconds": round(self.max_wait, 4),
+            "avg_service_seconds": round(self.avg_service, 4),
+        }
+
+
+browser_gate = AdmissionGate("browser", BROWSER_ADMISSION_CONCURRENCY, BROWSER_ADMISSION_QUEUE, BROWSER_ADMISSION_TIMEOUT)
+llm_gate = AdmissionGate("llm", LLM_ADMISSION_CONCURRENCY, LLM_ADMISSION_QUEUE, LLM_ADMISSION_TIMEOUT)
+extract_flight = SingleFlight("extract")
+translate_flight = SingleFlight("translate")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global http_client
+    http_client = create_http_client()
+    llm_router.start()
+    await ensure_catalog_indexes()
+    await ensure_translation_cache_indexes()
+    await ensure_job_indexes()
+    await browser_pool.start()
+    await job_manager.resume()
+    try:
+        yield
+    finally:
+        await job_manager.stop()
+        await browser_pool.stop()
+        await http_client.aclose()
+        await llm_router.close()
+        await mongo_client.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# chapter lists run to megabytes of JSON; brotli when installed, gzip otherwise.
+# Event streams are left uncompressed so tokens are not held back in the encoder.
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+if BrotliMiddleware is not None:
+    app.add_middleware(
+        BrotliMiddleware,
+        minimum_size=COMPRESSION_MIN_SIZE,
+        gzip_fallback=True,
+        excluded_handlers=["^/translate/stream$"],
+    )
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+
+class TraceMiddleware:
+    """Give each request a trace id, time it and log the stages it went through.
+
+    Plain ASGI rather than @app.middleware("http"), so streamed responses are timed
+    up to their last body chunk instead of until the headers go out.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex[:16]
+        timings: Dict[str, float] = {}
+        trace_token = trace_id_var.set(trace_id)
+        timings_token = stage_timings_var.set(timings)
+        started = time.perf_counter()
+        status = 500
+        recorded = False
+
+        def record():
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            elapsed = time.perf_counter() - started
+            # the route template keeps label cardinality bounded
+            path = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.labels(scope["method"], path, str(status)).observe(elapsed)
+            if timings:
+                stages = " ".join(f"{stage}={seconds:.3f}s" for stage, seconds in timings.items())
+                logging.info(f"[TIMING] {scope['method']} {path} {status} total={elapsed:.3f}s {stages}")
+
+        async def send_traced(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", trace_id.encode("latin-1"))]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        try:
+            await self.app(scope, receive, send_traced)
+        finally:
+            # errors and client disconnects end the request without a final body chunk
+            record()
+            stage_timings_var.reset(timings_token)
+            trace_id_var.reset(trace_token)
+
+
+app.add_middleware(TraceMiddleware)
 
 # get novel details
-def get_novel_details(page, base_url):
+# everything is read inside the page in one evaluate call instead of one
+# Playwright round trip per element and attribute
+NOVEL_DETAILS_JS = """
+() => {
+    const bookbox = document.querySelector('div.bookbox');
+    if (!bookbox) return null;
+    const coverImg = bookbox.querySelector('div.bookimg2 img');
+    const titleElement = bookbox.querySelector('div.booknav2 h1 a');
+    const authorP = Array.from(bookbox.querySelectorAll('div.booknav2 p'))
+        .find(p => p.textContent.includes('作者：'));
+    const authorElement = authorP ? authorP.querySelector('a') : null;
+    return {
+        cover: coverImg ? coverImg.getAttribute('src') : null,
+        title: titleElement ? titleElement.textContent : null,
+        authorLink: authorElement ? authorElement.textContent : null,
+        authorText: authorP ? authorP.textContent : null
+    };
+}
+"""
+
+async def get_novel_details(page, base_url):
     """Extract novel details from the main book page"""
     try:
-        page.wait_for_selector('div.bookbox', timeout=10000)
-        bookbox = page.query_selector('div.bookbox')
+        with stage_timer("selector_wait"):
+            await page.wait_for_selector('div.bookbox', timeout=10000)
+        with stage_timer("dom_extract"):
+            raw = await page.evaluate(NOVEL_DETAILS_JS)
 
-        if bookbox:
+        if raw:
             # Cover
-            cover_img = bookbox.query_selector('div.bookimg2 img')
-            cover_url = cover_img.get_attribute('src') if cover_img else None
+            cover_url = raw['cover']
             if cover_url and not cover_url.startswith('http'):
                 cover_url = urljoin(base_url, cover_url)
 
             # Title
-            title_element = bookbox.query_selector('div.booknav2 h1 a')
-            title = title_element.text_content().strip() if title_element else None
+            title = raw['title'].strip() if raw['title'] is not None else None
 
             # Author
-            author_element = bookbox.query_selector('div.booknav2 p:has-text("作者：") a')
-            author = author_element.text_content().strip() if author_element else None
-            if not author:
-                author_p = bookbox.query_selector('div.booknav2 p:has-text("作者：")')
-                if author_p:
-                    author_text = author_p.text_content().strip()
-                    author = author_text.replace('作者：', '').strip()
+            author = raw['authorLink'].strip() if raw['authorLink'] is not None else None
+            if not author and raw['authorText'] is not None:
+                author = raw['authorText'].strip().replace('作者：', '').strip()
 
             return {
                 'title': title,
@@ -54,198 +629,1129 @@ def get_novel_details(page, base_url):
             }
         return None
     except Exception as e:
-        print(f"Error extracting novel details: {e}")
+        logging.error(f"[SCRAPE] Error extracting novel details: {e}")
         return None
 
 # get chapters list
-def crawl_chapters(page, index_url):
-    """Crawl chapters from the index page"""
-    chapters_data = []
+CATALOG_POLL_INTERVAL = 250  # ms between chapter count checks after #loadmore
+CATALOG_GRACE_PERIOD = 2000  # ms to wait for the list to start growing
+CATALOG_SETTLE_PERIOD = 1000  # ms without growth once it has grown
+CATALOG_LOAD_TIMEOUT = 30000  # ms hard cap on waiting for a large catalog
+
+CATALOG_FIND_JS = """
+() => Array.from(document.querySelectorAll('div.catalog'))
+    .find(div => Array.from(div.querySelectorAll('h3')).some(h3 => h3.textContent.includes('目錄')))
+"""
+
+CATALOG_STATE_JS = """
+() => {
+    const catalog = (%s)();
+    if (!catalog) return null;
+    const allchapter = catalog.querySelector('div#allchapter');
+    if (!allchapter) return {allchapter: false, loadMore: false};
+    return {
+        allchapter: true,
+        loadMore: !!allchapter.querySelector('a#loadmore.btn.more-btn'),
+        count: allchapter.querySelectorAll('li[data-num]').length
+    };
+}
+""" % CATALOG_FIND_JS.strip()
+
+CATALOG_COUNT_JS = """
+() => document.querySelectorAll('div#allchapter li[data-num]').length
+"""
+
+# chapters from the start-th li[data-num] on, plus the li count to continue from
+CATALOG_ITEMS_JS = """
+(start) => {
+    const catalog = (%s)();
+    const allchapter = catalog && catalog.querySelector('div#allchapter');
+    if (!allchapter) return [start, []];
+    const lis = allchapter.querySelectorAll('li[data-num]');
+    const items = [];
+    for (let i = start; i < lis.length; i++) {
+        const anchor = lis[i].querySelector('a');
+        if (anchor) {
+            items.push([lis[i].getAttribute('data-num'), anchor.textContent, anchor.getAttribute('href')]);
+        }
+    }
+    return [lis.length, items];
+}
+""" % CATALOG_FIND_JS.strip()
+
+async def watch_catalog_growth(page, initial_count: int):
+    """Poll the chapter count after #loadmore, yielding it each time it grows, until it settles"""
+    count = initial_count
+    grown = False
+    idle = 0
+    waited = 0
+    while waited < CATALOG_LOAD_TIMEOUT:
+        await page.wait_for_timeout(CATALOG_POLL_INTERVAL)
+        waited += CATALOG_POLL_INTERVAL
+        current = await page.evaluate(CATALOG_COUNT_JS)
+        if current != count:
+            count = current
+            grown = True
+            idle = 0
+            yield count
+            continue
+        idle += CATALOG_POLL_INTERVAL
+        if idle >= (CATALOG_SETTLE_PERIOD if grown else CATALOG_GRACE_PERIOD):
+            break
+
+async def read_catalog_items(page, index_url: str, start: int):
+    """Chapters listed from the start-th catalog entry on; returns (next start, chapters)"""
+    with stage_timer("dom_extract"):
+        next_start, items = await page.evaluate(CATALOG_ITEMS_JS, start)
+    chapters = []
+    for chapter_num, chapter_name, href in items:
+        if href and not href.startswith('http'):
+            href = urljoin(index_url, href)
+        chapters.append({
+            'chapter_number': chapter_num,
+            'chapter_name': chapter_name.strip(),
+            'url': href
+        })
+    return next_start, chapters
+
+async def iter_catalog_batches(page, index_url):
+    """Yield the chapters of the index page in batches, as #loadmore appends them
+
+    The entries rendered with the page come first, then every slice the site
+    appends while the list grows. Nothing is yielded when the page has no catalog.
+    """
+    with stage_timer("navigation"):
+        await page.goto(index_url, wait_until='domcontentloaded')
+    with stage_timer("selector_wait"):
+        await page.wait_for_selector('div.catalog', timeout=10000)
+    state = await page.evaluate(CATALOG_STATE_JS)
+    if not state or not state['allchapter']:
+        return
+
+    start, chapters = await read_catalog_items(page, index_url, 0)
+    if chapters:
+        yield chapters
+
+    if state['loadMore']:
+        load_started = time.perf_counter()
+        paused = 0.0  # time spent by the consumer between batches is not catalog loading
+        await page.click('div#allchapter a#loadmore.btn.more-btn')
+        async for _ in watch_catalog_growth(page, state['count']):
+            start, chapters = await read_catalog_items(page, index_url, start)
+            if chapters:
+                yielded = time.perf_counter()
+                yield chapters
+                paused += time.perf_counter() - yielded
+        # anything appended after the last poll
+        start, chapters = await read_catalog_items(page, index_url, start)
+        observe_stage("catalog_load", time.perf_counter() - load_started - paused)
+        if chapters:
+            yield chapters
+
+# get novel details and chapters list
+class ScrapeError(Exception):
+    """Raised when a novel page does not yield details or chapters"""
+
+
+async def stream_novel(url: str):
+    """Scrape a novel on a pooled page, yielding ("novel", details) and then ("chapters", batch)
+    for each slice of the catalog as it loads"""
+    url = url.rstrip('/')
+    async with browser_pool.page() as page:
+        with stage_timer("navigation"):
+            await page.goto(url, wait_until='domcontentloaded')
+        novel_details = await get_novel_details(page, url)
+        if not novel_details:
+            raise ScrapeError("Failed to extract novel details")
+        yield "novel", novel_details
+
+        clean_base_url = url[:-5] if url.endswith('.html') else url
+        index_url = clean_base_url + "/index.html"
+        crawled = 0
+        try:
+            async for chapters in iter_catalog_batches(page, index_url):
+                crawled += len(chapters)
+                yield "chapters", chapters
+        except Exception as e:
+            logging.error(f"[SCRAPE] Error crawling chapters: {e}")
+            raise ScrapeError("Failed to crawl chapters")
+        if not crawled:
+            raise ScrapeError("Failed to crawl chapters")
+
+async def scrape_novel(url: str) -> Dict[str, Any]:
+    """Scrape novel details and the full chapters list on a pooled page"""
+    novel_details = None
+    chapters = []
+    async for kind, data in stream_novel(url):
+        if kind == "novel":
+            novel_details = data
+        else:
+            chapters.extend(data)
+
+    return {
+        'title': novel_details['title'],
+        'author': novel_details['author'],
+        'coverImg': novel_details['coverImg'],
+        'chapters': chapters
+    }
+
+# get single chapter content
+async def read_chapter_page(page, chapter_url: str, headless: bool = True):
+    """Navigate an already configured page to a chapter and return its cleaned text"""
+    with stage_timer("navigation"):
+        await page.goto(chapter_url, wait_until='domcontentloaded', timeout=45000 if headless else 30000)
+        await asyncio.sleep(2 if headless else 0)
+
+    content_element = None
     try:
-        page.goto(index_url, wait_until='domcontentloaded')
-        page.wait_for_selector('div.catalog', timeout=10000)
-        catalog_div = page.query_selector('div.catalog:has(h3:has-text("目錄"))')
-
-        if catalog_div:
-            allchapter_div = catalog_div.query_selector('div#allchapter')
-            if allchapter_div:
-                load_more_button = allchapter_div.query_selector('a#loadmore.btn.more-btn')
-                if load_more_button:
-                    load_more_button.click()
-                    page.wait_for_timeout(2000)
-
-                chapter_items = allchapter_div.query_selector_all('li[data-num]')
-                for item in chapter_items:
-                    anchor = item.query_selector('a')
-                    if anchor:
-                        chapter_name = anchor.text_content().strip()
-                        href = anchor.get_attribute('href')
-                        chapter_num = item.get_attribute('data-num')
-                        if href and not href.startswith('http'):
-                            href = urljoin(index_url, href)
-                        chapters_data.append({
-                            'chapter_number': chapter_num,
-                            'chapter_name': chapter_name,
-                            'url': href
-                        })
-                return chapters_data
+        with stage_timer("selector_wait"):
+            content_element = await page.wait_for_selector('div#txtcontent', timeout=8000)
+    except:
+        for sel in CHAPTER_CONTENT_SELECTORS:
+            el = await page.query_selector(sel)
+            if el:
+                content_element = el
+                break
+
+    if not content_element:
         return None
-    except Exception as e:
-        print(f"Error crawling chapters: {e}")
+
+    with stage_timer("dom_extract"):
+        content_html = await content_element.inner_html()
+    with stage_timer("text_clean"):
+        clean_content = clean_chapter_html(content_html)
+    return clean_content if len(clean_content) > CHAPTER_MIN_CONTENT_LENGTH else None
+
+def parse_chapter_html(html: str) -> Optional[str]:
+    """Find the chapter body in a fetched page and clean it; None when the page has none"""
+    with stage_timer("dom_extract"):
+        soup = BeautifulSoup(html, 'lxml')
+        content_element = soup.select_one('div#txtcontent')
+        if content_element is None:
+            for sel in CHAPTER_CONTENT_SELECTORS:
+                content_element = soup.select_one(sel)
+                if content_element is not None:
+                    break
+
+    if content_element is None:
         return None
 
-# get single chapter content
-def extract_single_chapter(chapter_url: str, headless: bool = True):
-    """Enhanced chapter content extraction with stealth features"""
-    from playwright.sync_api import sync_playwright
-    
-    with sync_playwright() as p:
-        browser = p.chromium.launch(
-            headless=headless,
-            args=[
-                '--no-sandbox',
-                '--disable-dev-shm-usage',
-                '--disable-blink-features=AutomationControlled',
-                '--disable-features=VizDisplayCompositor',
-                '--no-first-run',
-                '--no-default-browser-check',
-                '--disable-background-timer-throttling',
-                '--disable-backgrounding-occluded-windows',
-                '--disable-renderer-backgrounding',
-                '--disable-component-extensions-with-background-pages',
-                '--disable-default-apps',
-                '--disable-extensions',
-                '--disable-translate',
-                '--disable-features=TranslateUI',
-                '--mute-audio',
-                '--window-size=1920,1080'
-            ] if headless else []
-        )
+    with stage_timer("text_clean"):
+        return clean_chapter_html(content_element.decode_contents())
 
-        context = browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            extra_http_headers={
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'zh-TW,zh;q=0.9,en;q=0.8',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-            }
-        ) if headless else browser.new_context()
+async def fetch_chapter_http(chapter_url: str):
+    """Fetch a chapter without a browser; returns (content, None) or (None, fallback reason)"""
+    try:
+        with stage_timer("http_fetch"):
+            response = await http_client.get(chapter_url)
+    except httpx.HTTPError as e:
+        return None, f"http_error:{type(e).__name__}"
+
+    if response.status_code >= 400:
+        return None, f"status_{response.status_code}"
+
+    html = response.text
+    if any(marker in html for marker in CHALLENGE_MARKERS):
+        return None, "challenge"
+
+    # parsing a large page takes tens of milliseconds, which would stall every other request and stream
+    clean_content = await asyncio.to_thread(parse_chapter_html, html)
+    if clean_content is None:
+        return None, "missing_content"
+    if len(clean_content) <= CHAPTER_MIN_CONTENT_LENGTH:
+        return None, "short_content"
+    return clean_content, None
+
+async def extract_single_chapter(chapter_url: str, headless: bool = True, gate: Optional[AdmissionGate] = None):
+    """Enhanced chapter content extraction with stealth features
+
+    `gate` admits only the browser part; the HTTP fast path never waits on it.
+    """
+    if headless:
+        if EXTRACT_HTTP_FIRST:
+            content, reason = await fetch_chapter_http(chapter_url)
+            if content:
+                fetch_stats.record_hit()
+                return content
+            fetch_stats.record_fallback(reason)
+            logging.info(
+                f"[EXTRACT] HTTP fast path missed for {chapter_url} ({reason}), using browser "
+                f"(fast path hit rate {fetch_stats.hit_rate():.0%})"
+            )
+
+        async with gate.admit() if gate else nullcontext():
+            async with browser_pool.page() as page:
+                return await read_chapter_page(page, chapter_url, headless=True)
+
+    # headed runs are for debugging only and bypass the pool
+    async with gate.admit() if gate else nullcontext(), async_playwright() as p:
+        with stage_timer("browser_launch"):
+            browser = await p.chromium.launch(headless=False)
+        try:
+            context = await browser.new_context()
+            page = await context.new_page()
+            return await read_chapter_page(page, chapter_url, headless=False)
+        finally:
+            await browser.close()
 
-        page = context.new_page()
+# batch chapter extraction
+BATCH_GLOBAL_CONCURRENCY = int(os.getenv("BATCH_GLOBAL_CONCURRENCY", str(BROWSER_POOL_SIZE)))
+BATCH_PER_HOST_CONCURRENCY = int(os.getenv("BATCH_PER_HOST_CONCURRENCY", "2"))
+BATCH_MAX_ATTEMPTS = int(os.getenv("BATCH_MAX_ATTEMPTS", "3"))
+BATCH_RETRY_BACKOFF = float(os.getenv("BATCH_RETRY_BACKOFF", "1.0"))
 
-        if headless:
-            page.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]});
-                Object.defineProperty(navigator, 'languages', {get: () => ['zh-TW', 'zh', 'en-US', 'en']});
-                delete navigator.__proto__.webdriver;
-            """)
+# shared by every batch so concurrent batches cannot multiply the load on one host
+batch_global_limit = asyncio.Semaphore(BATCH_GLOBAL_CONCURRENCY)
+batch_host_limits: Dict[str, asyncio.Semaphore] = {}
 
-        try:
-            page.goto(chapter_url, wait_until='domcontentloaded', timeout=45000 if headless else 30000)
-            time.sleep(2 if headless else 0)
 
-            content_element = None
-            try:
-                content_element = page.wait_for_selector('div#txtcontent', timeout=8000)
-            except:
-                selectors = [
-                    '#txtcontent', '.content', '.chapter-content',
-                    '.txt-content', '[class*="content"]', '[id*="content"]'
-                ]
-                for sel in selectors:
-                    el = page.query_selector(sel)
-                    if el:
-                        content_element = el
-                        break
+def chapter_in_range(chapter_number, start: Optional[int], end: Optional[int]) -> bool:
+    """Check a data-num value against an inclusive chapter range"""
+    try:
+        num = int(chapter_number)
+    except (TypeError, ValueError):
+        return False
+    if start is not None and num < start:
+        return False
+    if end is not None and num > end:
+        return False
+    return True
 
-            if not content_element:
-                return None
-
-            content_html = content_element.inner_html()
-            text = content_html.replace('<br>', '\n').replace('<br/>', '\n').replace('<br />', '\n')
-            while '<' in text and '>' in text:
-                start = text.find('<')
-                end = text.find('>', start)
-                if end != -1:
-                    text = text[:start] + text[end+1:]
-                else:
-                    break
 
-            lines = [line.strip() for line in text.split('\n') if line.strip()]
-            clean_content = '\n'.join(lines)
+async def extract_chapter_with_retry(chapter: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract one chapter of a batch, retrying with exponential backoff"""
+    url = chapter['url']
+    host = urlparse(url).netloc
+    host_limit = batch_host_limits.setdefault(host, asyncio.Semaphore(BATCH_PER_HOST_CONCURRENCY))
 
-            return clean_content if len(clean_content) > 50 else None
-        finally:
-            browser.close()
+    error = None
+    for attempt in range(1, BATCH_MAX_ATTEMPTS + 1):
+        try:
+            async with host_limit, batch_global_limit:
+                content = await extract_single_chapter(url)
+            if content:
+                return {**chapter, 'success': True, 'content': content, 'attempts': attempt}
+            error = "Failed to extract content"
+        except Exception as e:
+            error = str(e)
+
+        if attempt < BATCH_MAX_ATTEMPTS:
+            logging.info(f"[BATCH] Attempt {attempt} failed for {url}: {error}")
+            await asyncio.sleep(BATCH_RETRY_BACKOFF * 2 ** (attempt - 1))
+
+    return {**chapter, 'success': False, 'error': error, 'attempts': BATCH_MAX_ATTEMPTS}
 
 # translator
 # -----------------------------
 # CONFIG
 # -----------------------------
-OPENROUTER_API_KEY = ""
-MONGODB_URI = ""
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
+MONGODB_URI = os.getenv("MONGODB_URI", "")
+TRANSLATION_MODEL = "tngtech/deepseek-r1t2-chimera:free"
+# bump whenever the system prompt or response format changes, it invalidates cached translations
+PROMPT_VERSION = "1"
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "256"))
+TRANSLATION_CACHE_TTL = int(os.getenv("TRANSLATION_CACHE_TTL", str(30 * 24 * 3600)))
+GLOSSARY_MATCHER_CACHE_SIZE = int(os.getenv("GLOSSARY_MATCHER_CACHE_SIZE", "128"))
+# how long a cached glossary is trusted before it is re-read (other processes may write it)
+GLOSSARY_CACHE_TTL = float(os.getenv("GLOSSARY_CACHE_TTL", "60"))
+# long chapters are split on paragraph boundaries into chunks of about this many source tokens
+TRANSLATION_CHUNK_TOKENS = int(os.getenv("TRANSLATION_CHUNK_TOKENS", "3000"))
+TRANSLATION_CHUNK_CONCURRENCY = int(os.getenv("TRANSLATION_CHUNK_CONCURRENCY", "4"))
+TRANSLATION_CHUNK_MAX_ATTEMPTS = int(os.getenv("TRANSLATION_CHUNK_MAX_ATTEMPTS", "3"))
+TRANSLATION_CHUNK_RETRY_BACKOFF = float(os.getenv("TRANSLATION_CHUNK_RETRY_BACKOFF", "2.0"))
+# upstream limits: a slow model must not hold every request hostage
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "300"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "50"))
+MONGODB_TIMEOUT_MS = int(os.getenv("MONGODB_TIMEOUT_MS", "5000"))
 
 # Initialize MongoDB client
-mongo_client = MongoClient(MONGODB_URI)
+mongo_client = AsyncMongoClient(
+    MONGODB_URI,
+    maxPoolSize=MONGODB_MAX_POOL_SIZE,
+    serverSelectionTimeoutMS=MONGODB_TIMEOUT_MS,
+    timeoutMS=MONGODB_TIMEOUT_MS,
+)
 db = mongo_client["novel-reader"]
 
+# one keep-alive connection pool per LLM endpoint, created in the lifespan
+llm_limit = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+
+class LLMBusyError(Exception):
+    """Raised when no LLM slot frees up within LLM_QUEUE_TIMEOUT"""
+
+
+def create_llm_client(base_url: str, api_key: str) -> AsyncOpenAI:
+    return AsyncOpenAI(
+        base_url=base_url,
+        api_key=api_key,
+        timeout=httpx.Timeout(LLM_REQUEST_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        # retries are done by the router, which can move on to another route instead
+        max_retries=0,
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS),
+            timeout=httpx.Timeout(LLM_REQUEST_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        ),
+    )
+
+@asynccontextmanager
+async def llm_slot(wait: bool = True):
+    """Hold one of the LLM_MAX_CONCURRENCY upstream slots for the duration of a call.
+
+    With wait=False a busy limit raises LLMBusyError at once instead of queueing.
+    """
+    if not wait and llm_limit.locked():
+        raise LLMBusyError("no LLM slot free")
+    try:
+        await asyncio.wait_for(llm_limit.acquire(), timeout=LLM_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise LLMBusyError(f"no LLM slot free within {LLM_QUEUE_TIMEOUT:g}s")
+    try:
+        yield
+    finally:
+        llm_limit.release()
+
+
+# -----------------------------
+# LLM ROUTING
+# -----------------------------
+# ordered list of models/endpoints, the first healthy one serves each request. Override with JSON, e.g.
+# LLM_ROUTES='[{"model": "deepseek/deepseek-chat-v3.1"}, {"model": "qwen/qwen3-235b-a22b", "first_token_timeout": 30},
+#              {"model": "deepseek-chat", "base_url": "https://api.deepseek.com", "api_key_env": "DEEPSEEK_API_KEY"}]'
+LLM_ROUTES = json.loads(os.getenv("LLM_ROUTES", "null")) or [{"model": TRANSLATION_MODEL}]
+# cached translations are keyed on the configured models, so changing the routes starts a fresh cache
+TRANSLATION_CACHE_MODEL = ",".join(route["model"] for route in LLM_ROUTES)
+# set per translation to a set that collects the models of the routes that answered it
+llm_models_var: ContextVar[Optional[set]] = ContextVar("llm_models", default=None)
+LLM_DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+# per-route defaults: whole completion, and time until the first token arrives
+LLM_ROUTE_TIMEOUT = float(os.getenv("LLM_ROUTE_TIMEOUT", str(LLM_REQUEST_TIMEOUT)))
+LLM_FIRST_TOKEN_TIMEOUT = float(os.getenv("LLM_FIRST_TOKEN_TIMEOUT", "90"))
+LLM_RETRY_ATTEMPTS = int(os.getenv("LLM_RETRY_ATTEMPTS", "3"))
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "1.0"))
+# start a backup request on the next route when no token arrived after this many seconds (0 = no hedging)
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "20"))
+# a route is moved behind the others for LLM_DEMOTE_PERIOD seconds when its recent error rate,
+# or its first-token latency relative to the fastest route, gets this bad
+LLM_DEMOTE_ERROR_RATE = float(os.getenv("LLM_DEMOTE_ERROR_RATE", "0.5"))
+LLM_DEMOTE_LATENCY_FACTOR = float(os.getenv("LLM_DEMOTE_LATENCY_FACTOR", "3"))
+LLM_DEMOTE_MIN_SAMPLES = int(os.getenv("LLM_DEMOTE_MIN_SAMPLES", "5"))
+LLM_DEMOTE_PERIOD = float(os.getenv("LLM_DEMOTE_PERIOD", "300"))
+LLM_STATS_ALPHA = 0.2
+# ask for token usage in the final stream chunk (OpenAI-compatible stream_options)
+LLM_STREAM_USAGE = os.getenv("LLM_STREAM_USAGE", "1") == "1"
+
+
+def is_retryable_llm_error(error: Exception) -> bool:
+    """Rate limits, server errors and timeouts are worth another try, bad requests are not."""
+    if isinstance(error, (APITimeoutError, APIConnectionError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+class LLMRoute:
+    """One model on one OpenAI-compatible endpoint, with its recent latency and error record."""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.model = config["model"]
+        self.name = config.get("name") or self.model
+        self.base_url = config.get("base_url") or LLM_DEFAULT_BASE_URL
+        if config.get("api_key_env"):
+            self.api_key = os.getenv(config["api_key_env"], "")
+        else:
+            self.api_key = config.get("api_key") or OPENROUTER_API_KEY
+        self.timeout = float(config.get("timeout", LLM_ROUTE_TIMEOUT))
+        self.first_token_timeout = float(config.get("first_token_timeout", LLM_FIRST_TOKEN_TIMEOUT))
+        self.client: Optional[AsyncOpenAI] = None
+
+        self.requests = 0
+        self.errors = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.last_error: Optional[str] = None
+        self.demoted_until = 0.0
+        self.reset()
+
+    def reset(self):
+        """Forget the recent record so a demoted route gets a fresh chance."""
+        self.samples = 0
+        self.error_rate = 0.0
+        self.first_token: Optional[float] = None
+        self.latency: Optional[float] = None
+
+    def record(self, ok: bool, first_token: Optional[float] = None, latency: Optional[float] = None):
+        self.samples += 1
+        self.error_rate += LLM_STATS_ALPHA * ((0.0 if ok else 1.0) - self.error_rate)
+        if first_token is not None:
+            self.first_token = first_token if self.first_token is None else \
+                self.first_token + LLM_STATS_ALPHA * (first_token - self.first_token)
+        if latency is not None:
+            self.latency = latency if self.latency is None else \
+                self.latency + LLM_STATS_ALPHA * (latency - self.latency)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "model": self.model,
+            "base_url": self.base_url,
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate, 3),
+            "avg_first_token_seconds": round(self.first_token, 3) if self.first_token is not None else None,
+            "avg_latency_seconds": round(self.latency, 3) if self.latency is not None else None,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "enabled": self.client is not None,
+            "demoted": self.demoted_until > time.monotonic(),
+            "last_error": self.last_error,
+        }
+
+
+class LLMAttempt:
+    """One streamed completion on one route, running in its own task and feeding a queue.
+
+    The queue receives content deltas, then None at the end of the stream or the exception
+    that stopped it. Owning the stream in a task lets a hedge race two of them and drop the loser.
+    `started` stays None until the attempt holds an LLM slot, so local queueing never counts
+    against the route; a hedge does not queue at all and fails with LLMBusyError instead.
+    """
+
+    def __init__(self, route: LLMRoute, messages: List[Dict[str, str]], hedge: bool = False):
+        self.route = route
+        self.hedge = hedge
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.sent = asyncio.Event()
+        self.started: Optional[float] = None
+        self.first_token_at: Optional[float] = None
+        self.finish_reason: Optional[str] = None
+        self.usage = None
+        self.task = asyncio.create_task(self._run(messages))
+
+    async def _run(self, messages: List[Dict[str, str]]):
+        try:
+            async with llm_slot(wait=not self.hedge):
+                self.started = time.monotonic()
+                self.route.requests += 1
+                if self.hedge:
+                    self.route.hedges += 1
+                self.sent.set()
+                async with asyncio.timeout(self.route.timeout):
+                    stream = await self.route.client.chat.completions.create(
+                        model=self.route.model,
+                        messages=messages,
+                        stream=True,
+                        **({"stream_options": {"include_usage": True}} if LLM_STREAM_USAGE else {}),
+                    )
+                    async for chunk in stream:
+                        if getattr(chunk, "usage", None):
+                            self.usage = chunk.usage
+                        if not chunk.choices:
+                            continue
+                        choice = chunk.choices[0]
+                        if choice.finish_reason:
+                            self.finish_reason = choice.finish_reason
+                        if choice.delta.content:
+                            if self.first_token_at is None:
+                                self.first_token_at = time.monotonic()
+                            self.queue.put_nowait(choice.delta.content)
+                        elif self.first_token_at is None and (
+                            getattr(choice.delta, "reasoning", None) or getattr(choice.delta, "reasoning_content", None)
+                        ):
+                            # reasoning models think for a minute or more before writing; the first
+                            # thought already shows the route is answering, so it ends the first-token
+                            # wait and the hedge timer. The empty delta carries no text.
+                            self.first_token_at = time.monotonic()
+                            self.queue.put_nowait("")
+            self.queue.put_nowait(None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.queue.put_nowait(e)
+
+    def cancel(self):
+        self.task.cancel()
+
+
+class LLMRouter:
+    """Send completions to the first healthy route, hedging slow first tokens and failing over on errors."""
+
+    def __init__(self, routes: List[Dict[str, Any]]):
+        self.routes = [LLMRoute(r) for r in routes]
+        self._clients: Dict[tuple, AsyncOpenAI] = {}
+
+    def start(self):
+        # routes on the same endpoint share its connection pool
+        for route in self.routes:
+            if not route.api_key:
+                # the client refuses an empty key; leave the route out so the rest of the app still starts
+                logging.error(f"[LLM] Route {route.name} has no API key and will not be used")
+                continue
+            key = (route.base_url, route.api_key)
+            if key not in self._clients:
+                self._clients[key] = create_llm_client(route.base_url, route.api_key)
+            route.client = self._clients[key]
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.close()
+        self._clients.clear()
+
+    def is_demoted(self, route: LLMRoute) -> bool:
+        if route.demoted_until and time.monotonic() >= route.demoted_until:
+            logging.info(f"[LLM] Route {route.name} restored after demotion")
+            route.demoted_until = 0.0
+            route.reset()
+        return route.demoted_until > 0
+
+    def ordered(self) -> List[LLMRoute]:
+        """Routes in configured order, demoted ones moved to the back as a last resort."""
+        return sorted(self.routes, key=self.is_demoted)
+
+    def _review(self, route: LLMRoute):
+        if route.samples < LLM_DEMOTE_MIN_SAMPLES or self.is_demoted(route):
+            return
+        others = [
+            r.first_token for r in self.routes
+            if r is not route and r.first_token is not None and not self.is_demoted(r)
+        ]
+        slow = bool(others) and route.first_token is not None and \
+            route.first_token > min(others) * LLM_DEMOTE_LATENCY_FACTOR
+        if route.error_rate > LLM_DEMOTE_ERROR_RATE or slow:
+            if route.error_rate > LLM_DEMOTE_ERROR_RATE:
+                reason = f"error rate {route.error_rate:.2f}"
+            else:
+                reason = f"first token {route.first_token:.1f}s"
+            logging.info(f"[LLM] Demoting route {route.name} for {LLM_DEMOTE_PERIOD:.0f}s ({reason})")
+            route.demoted_until = time.monotonic() + LLM_DEMOTE_PERIOD
+
+    def _succeeded(self, attempt: LLMAttempt):
+        route = attempt.route
+        first_token = attempt.first_token_at - attempt.started
+        latency = time.monotonic() - attempt.started
+        route.record(True, first_token, latency)
+        models = llm_models_var.get()
+        if models is not None:
+            models.add(route.model)
+        self._review(route)
+
+        LLM_REQUESTS.labels(route.name, "ok").inc()
+        LLM_FIRST_TOKEN_SECONDS.labels(route.name).observe(first_token)
+        LLM_COMPLETION_SECONDS.labels(route.name).observe(latency)
+        observe_stage("llm_first_token", first_token)
+        observe_stage("llm_total", latency)
+        tokens = ""
+        if attempt.usage is not None:
+            prompt_tokens = attempt.usage.prompt_tokens or 0
+            completion_tokens = attempt.usage.completion_tokens or 0
+            # prompt tokens the provider served from its prefix cache, when it reports them
+            details = getattr(attempt.usage, "prompt_tokens_details", None)
+            cached_tokens = getattr(details, "cached_tokens", None) or 0
+            LLM_TOKENS.labels(route.name, "prompt").inc(prompt_tokens)
+            LLM_TOKENS.labels(route.name, "cached_prompt").inc(cached_tokens)
+            LLM_TOKENS.labels(route.name, "completion").inc(completion_tokens)
+            tokens = f", {prompt_tokens} prompt ({cached_tokens} cached) / {completion_tokens} completion tokens"
+        logging.info(f"[LLM] {route.name}: first token {first_token:.2f}s, total {latency:.2f}s{tokens}")
+
+    def _failed(self, attempt: LLMAttempt, error: Exception):
+        route = attempt.route
+        route.errors += 1
+        route.last_error = f"{type(error).__name__}: {error}"
+        route.record(False)
+        self._review(route)
+        LLM_REQUESTS.labels(route.name, "error").inc()
+        logging.info(f"[LLM] Route {route.name} failed: {route.last_error}")
+
+    def _abandoned(self, attempt: LLMAttempt):
+        attempt.cancel()
+        if attempt.started is None:
+            # never got a slot, so the provider never saw it
+            return
+        # a hedge loser still waiting for its first token: the wait so far is a lower bound on its latency
+        if attempt.first_token_at is None:
+            attempt.route.record(True, first_token=time.monotonic() - attempt.started)
+            self._review(attempt.route)
+        LLM_REQUESTS.labels(attempt.route.name, "abandoned").inc()
+
+    async def _race(self, primary: LLMRoute, backup: Optional[LLMRoute], messages: List[Dict[str, str]]):
+        """Start primary, hedge onto backup if its first token is late, return whichever answers first."""
+        attempts: Dict[asyncio.Task, LLMAttempt] = {}
+        winner = None
+
+        def launch(route: LLMRoute, hedge: bool = False) -> LLMAttempt:
+            attempt = LLMAttempt(route, messages, hedge=hedge)
+            attempts[asyncio.create_task(attempt.queue.get())] = attempt
+            return attempt
+
+        first = launch(primary)
+        # the timeouts and the hedge delay run from the moment the primary holds a slot
+        first_sent = asyncio.create_task(first.sent.wait())
+        hedge_pending = backup is not None and LLM_HEDGE_AFTER > 0
+        error: Exception = RuntimeError(f"no response from {primary.name}")
+
+        try:
+            while attempts:
+                deadlines = [a.started + a.route.first_token_timeout for a in attempts.values() if a.started is not None]
+                if hedge_pending and first.started is not None:
+                    deadlines.append(first.started + LLM_HEDGE_AFTER)
+                waiting = set(attempts)
+                if not first_sent.done():
+                    waiting.add(first_sent)
+                done, _ = await asyncio.wait(
+                    waiting, timeout=max(0.0, min(deadlines) - time.monotonic()) if deadlines else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+
+                for getter in done:
+                    if getter is first_sent:
+                        continue
+                    attempt = attempts.pop(getter)
+                    item = getter.result()
+                    if isinstance(item, str):
+                        if winner is None:
+                            winner = (attempt, item)
+                        else:
+                            attempt.cancel()
+                        continue
+                    if isinstance(item, LLMBusyError):
+                        if attempt.hedge:
+                            logging.info(f"[LLM] Skipped hedge on {attempt.route.name}: {item}")
+                            continue
+                        raise item
+                    error = item if item is not None else RuntimeError(f"empty completion from {attempt.route.name}")
+                    self._failed(attempt, error)
+                if winner is not None:
+                    if winner[0].hedge:
+                        winner[0].route.hedge_wins += 1
+                    return winner
+
+                now = time.monotonic()
+                for getter, attempt in list(attempts.items()):
+                    if attempt.started is not None and now >= attempt.started + attempt.route.first_token_timeout:
+                        del attempts[getter]
+                        getter.cancel()
+                        attempt.cancel()
+                        error = asyncio.TimeoutError(
+                            f"no first token from {attempt.route.name} within {attempt.route.first_token_timeout:g}s"
+                        )
+                        self._failed(attempt, error)
+                if hedge_pending and first.started is not None and now >= first.started + LLM_HEDGE_AFTER and attempts:
+                    hedge_pending = False
+                    logging.info(f"[LLM] No first token from {primary.name} after {LLM_HEDGE_AFTER:g}s, hedging with {backup.name}")
+                    launch(backup, hedge=True)
+            raise error
+        finally:
+            first_sent.cancel()
+            for getter, attempt in attempts.items():
+                getter.cancel()
+                self._abandoned(attempt)
+
+    async def _first_token(self, messages: List[Dict[str, str]], failed: List[LLMRoute] = ()):
+        """Walk the routes with retries and backoff until one starts answering.
+
+        Routes in `failed` already broke off a response for this request and are tried last.
+        """
+        routes = sorted((r for r in self.ordered() if r.client is not None), key=lambda r: r in failed)
+        if not routes:
+            raise RuntimeError("no LLM route is configured with an API key")
+        tried = []
+        error: Optional[Exception] = None
+        for n in range(LLM_RETRY_ATTEMPTS):
+            route = routes[n % len(routes)]
+            backup = routes[(n + 1) % len(routes)] if len(routes) > 1 else None
+            tried.append(route)
+            try:
+                return await self._race(route, backup, messages)
+            except LLMBusyError:
+                raise
+            except Exception as e:
+                error = e
+            if n + 1 == LLM_RETRY_ATTEMPTS:
+                break
+            next_route = routes[(n + 1) % len(routes)]
+            if next_route in tried:
+                # back on a route that already failed: only worth it for transient errors, after a pause
+                if not is_retryable_llm_error(error):
+                    break
+                await asyncio.sleep(LLM_RETRY_BACKOFF * 2 ** n)
+        raise RuntimeError(f"all LLM routes failed, last error: {error}")
+
+    async def stream(self, messages: List[Dict[str, str]]):
+        """Yield completion deltas from the first route to start answering."""
+        attempt, delta = await self._first_token(messages)
+        try:
+            if delta:
+                yield delta
+            while True:
+                item = await attempt.queue.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    # tokens were already handed out, so the stream cannot silently switch routes
+                    self._failed(attempt, item)
+                    raise RuntimeError(f"{attempt.route.name} failed mid-stream: {item}")
+                yield item
+            self._succeeded(attempt)
+        finally:
+            attempt.cancel()
+
+    async def complete(self, messages: List[Dict[str, str]]):
+        """Full completion text and finish reason, with the same routing as stream().
+
+        Nothing reaches the caller before the reply is complete, so a route that breaks
+        off mid-response is failed over like one that never answered.
+        """
+        failed: List[LLMRoute] = []
+        error: Optional[Exception] = None
+        for _ in range(LLM_RETRY_ATTEMPTS):
+            attempt, delta = await self._first_token(messages, failed)
+            parts = [delta]
+            try:
+                while True:
+                    item = await attempt.queue.get()
+                    if item is None:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    parts.append(item)
+            except Exception as e:
+                self._failed(attempt, e)
+                failed.append(attempt.route)
+                error = e
+                continue
+            finally:
+                attempt.cancel()
+            self._succeeded(attempt)
+            return "".join(parts), attempt.finish_reason
+        raise RuntimeError(f"all LLM routes failed mid-response, last error: {error}")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [r.stats() for r in self.ordered()]
+
+
+llm_router = LLMRouter(LLM_ROUTES)
+
+
+# -----------------------------
+# CATALOG INDEX
+# -----------------------------
+CATALOG_HISTORY_SIZE = 50
+SCRAPE_PAGE_MAX = int(os.getenv("SCRAPE_PAGE_MAX", "1000"))
+SCRAPE_STREAM_BATCH = int(os.getenv("SCRAPE_STREAM_BATCH", "200"))
+SCRAPE_UPDATES_CONCURRENCY = int(os.getenv("SCRAPE_UPDATES_CONCURRENCY", str(BROWSER_POOL_SIZE)))
+
+
+async def ensure_catalog_indexes():
+    """Create the indexes the catalog sync relies on (idempotent)."""
+    try:
+        await db.chapter_index.create_index([("novel_url", 1), ("chapter_number", 1)], unique=True)
+        await db.chapter_index.create_index([("novel_url", 1), ("updated_at", 1)])
+        await db.chapter_index.create_index([("novel_url", 1), ("num", 1)])
+    except Exception as e:
+        logging.error(f"[CATALOG] Could not create indexes: {e}")
+
+def chapter_sort_number(chapter_number) -> Optional[int]:
+    """Numeric data-num used to order stored catalogs; None when it is not a number"""
+    try:
+        return int(chapter_number)
+    except (TypeError, ValueError):
+        return None
+
+def compute_catalog_hash(chapters) -> str:
+    """ETag-like fingerprint of a chapter list in page order."""
+    digest = hashlib.sha256()
+    for c in chapters:
+        digest.update(f"{c['chapter_number']}\x1f{c['chapter_name']}\x1f{c['url']}\x1e".encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+async def sync_catalog(novel_url: str, novel: Dict[str, Any]) -> Dict[str, Any]:
+    """Store a freshly scraped catalog, writing only new or changed chapters."""
+    chapters = novel['chapters']
+    catalog_hash = compute_catalog_hash(chapters)
+    now = datetime.now(timezone.utc)
+
+    previous = await db.catalogs.find_one({"_id": novel_url}, {"catalog_hash": 1, "history": 1, "num_indexed": 1}) or {}
+    sync = {
+        "catalog_hash": catalog_hash,
+        "previous_hash": previous.get("catalog_hash"),
+        "history": previous.get("history", []),
+        "changed": [],
+    }
+
+    if sync["previous_hash"] == catalog_hash and previous.get("num_indexed"):
+        await db.catalogs.update_one({"_id": novel_url}, {"$set": {"synced_at": now}})
+        return sync
+
+    stored = {
+        doc["chapter_number"]: doc
+        async for doc in db.chapter_index.find(
+            {"novel_url": novel_url}, {"_id": 0, "chapter_number": 1, "chapter_name": 1, "url": 1, "num": 1}
+        )
+    }
+    rewrite = []
+    for c in chapters:
+        known = stored.get(c['chapter_number'])
+        if known is None or known.get('chapter_name') != c['chapter_name'] or known.get('url') != c['url']:
+            sync["changed"].append(c)
+            rewrite.append(c)
+        elif "num" not in known:
+            # stored before pages were sorted by num: backfill without reporting it as changed
+            rewrite.append(c)
+
+    if rewrite:
+        changed = {c['chapter_number'] for c in sync["changed"]}
+        await db.chapter_index.bulk_write([
+            UpdateOne(
+                {"novel_url": novel_url, "chapter_number": c['chapter_number']},
+                {
+                    "$set": {
+                        "chapter_name": c['chapter_name'],
+                        "url": c['url'],
+                        "num": chapter_sort_number(c['chapter_number']),
+                        **({"updated_at": now} if c['chapter_number'] in changed else {}),
+                    },
+                    "$setOnInsert": {"first_seen": now},
+                },
+                upsert=True,
+            )
+            for c in rewrite
+        ], ordered=False)
+
+    await db.catalogs.update_one(
+        {"_id": novel_url},
+        {
+            "$set": {
+                "title": novel['title'],
+                "author": novel['author'],
+                "coverImg": novel['coverImg'],
+                "catalog_hash": catalog_hash,
+                "chapter_count": len(chapters),
+                "synced_at": now,
+                # every stored chapter carries num, so pages can be served from the index
+                "num_indexed": True,
+            },
+            "$push": {"history": {"$each": [{"hash": catalog_hash, "synced_at": now}], "$slice": -CATALOG_HISTORY_SIZE}},
+        },
+        upsert=True,
+    )
+    return sync
+
+async def select_catalog_changes(novel_url: str, chapters, sync: Optional[Dict[str, Any]],
+                           since: Optional[int] = None, catalog_hash: Optional[str] = None):
+    """Pick the chapters a client is missing, given what it last saw.
+
+    Returns None when the client gave no reference point and needs the full list.
+    """
+    if catalog_hash and sync:
+        if catalog_hash == sync["catalog_hash"]:
+            return []
+        seen = [h for h in sync["history"] if h["hash"] == catalog_hash]
+        if seen:
+            updated = {
+                doc["chapter_number"]
+                async for doc in db.chapter_index.find(
+                    {"novel_url": novel_url, "updated_at": {"$gt": seen[-1]["synced_at"]}},
+                    {"_id": 0, "chapter_number": 1}
+                )
+            }
+            return [c for c in chapters if c['chapter_number'] in updated]
+    if since is not None:
+        return [c for c in chapters if chapter_in_range(c['chapter_number'], since + 1, None)]
+    return None
+
+async def sync_novel_catalog(url: str, since: Optional[int] = None, catalog_hash: Optional[str] = None):
+    """Scrape a novel, store its catalog and work out the chapters to return."""
+    novel = await scrape_novel(url)
+    try:
+        sync = await sync_catalog(url, novel)
+    except Exception as e:
+        # the live catalog is still good without the stored index
+        logging.error(f"[CATALOG] Sync failed for {url}: {e}")
+        sync = None
+    selected = await select_catalog_changes(url, novel['chapters'], sync, since, catalog_hash)
+    return novel, sync, selected
+
+async def stored_catalog_page(novel_url: str, offset: int, limit: int,
+                              since: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """One page of a stored catalog in chapter order, or None if the novel was never synced."""
+    catalog = await db.catalogs.find_one(
+        {"_id": novel_url}, {"title": 1, "author": 1, "coverImg": 1, "catalog_hash": 1, "num_indexed": 1}
+    )
+    if not catalog or not catalog.get("num_indexed"):
+        return None
+
+    query = {"novel_url": novel_url}
+    if since is not None:
+        query["num"] = {"$gt": since}
+    total = await db.chapter_index.count_documents(query)
+    total_chapters = total if since is None else await db.chapter_index.count_documents({"novel_url": novel_url})
+    chapters = [
+        doc async for doc in db.chapter_index.find(
+            query, {"_id": 0, "chapter_number": 1, "chapter_name": 1, "url": 1}
+        ).sort([("num", 1), ("chapter_number", 1)]).skip(offset).limit(limit)
+    ]
+    return {
+        "title": catalog.get("title"),
+        "author": catalog.get("author"),
+        "coverImg": catalog.get("coverImg"),
+        "chapters": chapters,
+        "catalog_hash": catalog["catalog_hash"],
+        "total_chapters": total_chapters,
+        "total": total,
+    }
+
 
 # -----------------------------
 # HELPER FUNCTIONS
 # -----------------------------
-def get_novel_glossary(novel_id: str) -> Dict[str, str]:
-    """Get glossary for a specific novel from MongoDB."""
+# novel_id -> (glossary_version, loaded_at, glossary); entries are replaced, never mutated
+glossary_cache = OrderedDict()
+# novel_id -> custom style exemplar (None for the default), refreshed with every glossary read
+novel_exemplars = OrderedDict()
+
+def remember_novel(cache: OrderedDict, novel_id: str, value):
+    """Store a per-novel entry, keeping the GLOSSARY_MATCHER_CACHE_SIZE most recent novels."""
+    cache[novel_id] = value
+    cache.move_to_end(novel_id)
+    while len(cache) > GLOSSARY_MATCHER_CACHE_SIZE:
+        cache.popitem(last=False)
+
+def cache_novel_glossary(novel_id: str, version: int, glossary: Dict[str, str]):
+    """Remember a glossary unless a newer version is already cached."""
+    current = glossary_cache.get(novel_id)
+    if current is None or version >= current[0]:
+        remember_novel(glossary_cache, novel_id, (version, time.monotonic(), glossary))
+
+async def get_novel_glossary(novel_id: str) -> Dict[str, str]:
+    """Get glossary for a specific novel, from the in-process cache or MongoDB."""
+    cached = glossary_cache.get(novel_id)
+    # the exemplar is evicted separately; without it the novel is read again
+    if cached and novel_id in novel_exemplars and time.monotonic() - cached[1] < GLOSSARY_CACHE_TTL:
+        glossary_cache.move_to_end(novel_id)
+        novel_exemplars.move_to_end(novel_id)
+        return cached[2]
+
     try:
-        novel = db.novels.find_one({"_id": ObjectId(novel_id)})
-        if novel and "glossary" in novel:
+        with stage_timer("glossary_read"):
+            novel = await db.novels.find_one(
+                {"_id": ObjectId(novel_id)}, {"glossary": 1, "glossary_version": 1, "style_exemplar": 1}
+            )
+        if novel:
+            remember_novel(novel_exemplars, novel_id, novel.get("style_exemplar") or None)
+        if novel and novel.get("glossary"):
+            cache_novel_glossary(novel_id, novel.get("glossary_version", 0), novel["glossary"])
             return novel["glossary"]
         return {}
     except Exception as e:
-        print(f"Error fetching glossary for novel {novel_id}: {e}")
+        logging.error(f"[GLOSSARY] Error fetching glossary for novel {novel_id}: {e}")
         return {}
 
-def update_novel_glossary(novel_id: str, new_terms: Dict[str, str]) -> bool:
-    """Update novel's glossary with new terms in MongoDB."""
+def is_glossary_key_storable(term: str) -> bool:
+    """Dotted-path updates cannot address keys containing '.' or starting with '$'."""
+    return bool(term) and '.' not in term and not term.startswith('$')
+
+async def update_novel_glossary(novel_id: str, new_terms: Dict[str, str]) -> Optional[tuple]:
+    """Add new terms to a novel's glossary; return the resulting glossary and how many keys it gained.
+
+    Each term is its own dotted-path $set, so concurrent chapters of the same
+    novel merge instead of overwriting each other's terms.
+    """
+    storable = {k: v for k, v in new_terms.items() if is_glossary_key_storable(k)}
+    if len(storable) < len(new_terms):
+        logging.info(f"[GLOSSARY] Skipped {len(new_terms) - len(storable)} terms with unstorable keys for novel {novel_id}")
+    if not storable:
+        return None
+
     try:
-        # Get current glossary
-        current_glossary = get_novel_glossary(novel_id)
-        
-        # Merge with new terms (new terms take precedence)
-        updated_glossary = {**current_glossary, **new_terms}
-        
-        # Update in database
-        result = db.novels.update_one(
-            {"_id": ObjectId(novel_id)},
-            {"$set": {"glossary": updated_glossary}}
-        )
-        
-        return result.modified_count > 0
+        with stage_timer("glossary_write"):
+            novel = await db.novels.find_one_and_update(
+                {"_id": ObjectId(novel_id)},
+                {
+                    "$set": {f"glossary.{k}": v for k, v in storable.items()},
+                    "$inc": {"glossary_version": 1}
+                },
+                projection={"glossary": 1, "glossary_version": 1},
+                # the document before the update tells which keys are new
+                return_document=ReturnDocument.BEFORE
+            )
+        if not novel:
+            return None
+
+        previous = novel.get("glossary") or {}
+        glossary = {**previous, **storable}
+        cache_novel_glossary(novel_id, novel.get("glossary_version", 0) + 1, glossary)
+        add_glossary_matcher_terms(novel_id, storable.keys())
+        return glossary, len(storable.keys() - previous.keys())
     except Exception as e:
-        print(f"Error updating glossary for novel {novel_id}: {e}")
-        return False
+        logging.error(f"[GLOSSARY] Error updating glossary for novel {novel_id}: {e}")
+        return None
 
-def translate_text_openrouter(text: str, chapter_name: str, glossary: Dict[str, str]):
-    """Translate Chinese text and chapter name to English using OpenRouter + DeepSeek."""
-    client = OpenAI(base_url="https://openrouter.ai/api/v1", api_key=OPENROUTER_API_KEY)
+# compiled matchers per novel, kept in step with the glossary as terms are added
+glossary_matchers = OrderedDict()
 
-    # glossary context
+_CJK_RE = re.compile(r'[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]')
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about one token per CJK character, four characters otherwise."""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+def add_glossary_matcher_terms(novel_id: str, terms):
+    """Feed newly added glossary keys into a novel's cached matcher, if it has one."""
+    matcher = glossary_matchers.get(novel_id)
+    if matcher is not None:
+        matcher.add(terms)
+
+def relevant_glossary_terms(novel_id: str, glossary: Dict[str, str], text: str, chapter_name: str) -> Dict[str, str]:
+    """Glossary entries whose Chinese key occurs in the chapter text or title."""
+    if not glossary:
+        return {}
+
+    matcher = glossary_matchers.get(novel_id)
+    if matcher is None or not matcher.terms <= glossary.keys():
+        # first use, or terms were removed from the glossary: compile from scratch
+        matcher = GlossaryMatcher(glossary.keys())
+        glossary_matchers[novel_id] = matcher
+    else:
+        matcher.add(glossary.keys() - matcher.terms)
+    glossary_matchers.move_to_end(novel_id)
+    while len(glossary_matchers) > GLOSSARY_MATCHER_CACHE_SIZE:
+        glossary_matchers.popitem(last=False)
+
+    found = matcher.find(chapter_name + "\x00" + text)
+
+    relevant = {k: glossary[k] for k in sorted(found)}
+
+    if len(relevant) < len(glossary):
+        saved = estimate_tokens(format_glossary_context(glossary)) - estimate_tokens(format_glossary_context(relevant))
+        logging.info(
+            f"[GLOSSARY] Novel ID: {novel_id} - sending {len(relevant)}/{len(glossary)} terms "
+            f"(~{saved} prompt tokens saved)"
+        )
+    return relevant
+
+def format_glossary_context(glossary: Dict[str, str]) -> str:
+    """Glossary block prepended to the user prompt."""
     glossary_context = ""
     if glossary:
         glossary_context = "Use the following glossary for proper nouns:\n"
-        for chinese, english in glossary.items():
+        # sorted, so the same terms always produce the same prompt text
+        for chinese, english in sorted(glossary.items()):
             glossary_context += f"{chinese} -> {english}\n"
         glossary_context += "\n"
+    return glossary_context
 
-    # system prompt
-    system_prompt = """You are a professional translator from Chinese to English.
-    Follow these rules:
-    1. Translate both the chapter title and content naturally while preserving the original meaning.
-    2. Use the same writing style used in the following extract of english text: <It had been three months since Lai Yang crossed over to this world with a system that granted him a single stat point every day, with a chance to earn a special stat point.
+# system prompt
+# Instructions and style exemplar form a fixed prefix shared by every call, so providers that
+# cache prompt prefixes can reuse it; everything that varies per chapter goes in the user message.
+# A novel can swap the exemplar through the style_exemplar field of its document.
+BUILTIN_STYLE_EXEMPLAR = """It had been three months since Lai Yang crossed over to this world with a system that granted him a single stat point every day, with a chance to earn a special stat point.
 
 Vitality, Strength, Defense and Agility were classified as basic attributes while Spirit, Mana, and Lifespan were categorized as special attributes.
 
@@ -331,7 +1837,16 @@ Lai Yang did not reply, placing a few pieces of silver by the knife, he graduall
 
 Only after he left did Zhu the butcher dare to slowly stand up, staring at the knife and silver on the table with a mix of emotions.
 
-“Sigh…”>
+“Sigh…”"""
+TRANSLATION_STYLE_EXEMPLAR = BUILTIN_STYLE_EXEMPLAR
+if os.getenv("PROMPT_EXEMPLAR_FILE"):
+    with open(os.getenv("PROMPT_EXEMPLAR_FILE"), encoding="utf-8") as exemplar_file:
+        TRANSLATION_STYLE_EXEMPLAR = exemplar_file.read().strip()
+
+TRANSLATION_SYSTEM_PROMPT_TEMPLATE = """You are a professional translator from Chinese to English.
+    Follow these rules:
+    1. Translate both the chapter title and content naturally while preserving the original meaning.
+    2. {style_rule}
     3. For proper nouns (names, places, items, etc.), use the provided glossary if available.
     4. If you encounter a Chinese proper noun (specifically names of people and locations) or name of certain cultivation realms not in the glossary, add it to the new terms list.
     5. Format your response EXACTLY as follows:
@@ -341,24 +1856,96 @@ Only after he left did Zhu the butcher dare to slowly stand up, staring at the k
 
     Each term should be on a separate line in the NEW_TERMS section.
     Only include one term per line in the format "chinese:english"."""
+STYLE_RULE = "Use the same writing style used in the following extract of english text: <{exemplar}>"
+STYLE_RULE_WITHOUT_EXEMPLAR = "Write fluent, natural English prose in the style of a published web novel translation."
+
+# estimated input tokens per call; over it the exemplar is cut down in these steps, largest first.
+# A few fixed steps keep the number of distinct prefixes (and cache misses) small.
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "12000"))
+PROMPT_EXEMPLAR_STEPS = (1.0, 0.5, 0.25, 0.0)
+
+@functools.lru_cache(maxsize=64)
+def translation_prefix(exemplar: str, step: float = 1.0):
+    """System prompt with the exemplar cut to about `step` of its size at paragraph ends, and its token estimate."""
+    rule = STYLE_RULE_WITHOUT_EXEMPLAR
+    if step > 0 and exemplar:
+        limit = estimate_tokens(exemplar) * step
+        kept = []
+        used = 0
+        for paragraph in exemplar.split("\n\n"):
+            tokens = estimate_tokens(paragraph)
+            if kept and used + tokens > limit:
+                break
+            kept.append(paragraph)
+            used += tokens
+        rule = STYLE_RULE.replace("{exemplar}", "\n\n".join(kept))
+    prompt = TRANSLATION_SYSTEM_PROMPT_TEMPLATE.replace("{style_rule}", rule)
+    return prompt, estimate_tokens(prompt)
+
+TRANSLATION_MARKERS = ("CHAPTER_TITLE:", "TRANSLATION:", "NEW_TERMS:")
+
+def build_translation_messages(text: str, chapter_name: str, glossary: Dict[str, str], part=None,
+                               exemplar: Optional[str] = None):
+    """Chat messages for one translation request.
+
+    part is (index, total) when text is one chunk of a longer chapter; only the
+    first chunk asks for the chapter title. exemplar replaces the default style
+    exemplar, and is cut down when the prompt would exceed PROMPT_TOKEN_BUDGET.
+    """
+    # glossary context
+    glossary_context = format_glossary_context(glossary)
 
-    user_prompt = f"""{glossary_context}Chapter Title: {chapter_name}
+    if part is None:
+        user_prompt = f"""{glossary_context}Chapter Title: {chapter_name}
 
 Chapter Content:
 {text}
 
 Please translate both the chapter title and content."""
+    elif part[0] == 0:
+        user_prompt = f"""{glossary_context}Chapter Title: {chapter_name}
 
-    response = client.chat.completions.create(
-        model="tngtech/deepseek-r1t2-chimera:free",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
+Chapter Content (part 1 of {part[1]}):
+{text}
+
+Please translate both the chapter title and this part of the content."""
+    else:
+        user_prompt = f"""{glossary_context}Chapter Content (part {part[0] + 1} of {part[1]}):
+{text}
+
+Please translate this part of the content. The chapter title is translated separately, leave CHAPTER_TITLE empty."""
+
+    user_tokens = estimate_tokens(user_prompt)
+    for step in PROMPT_EXEMPLAR_STEPS:
+        system_prompt, prefix_tokens = translation_prefix(exemplar or TRANSLATION_STYLE_EXEMPLAR, step)
+        if prefix_tokens + user_tokens <= PROMPT_TOKEN_BUDGET:
+            break
+
+    PROMPT_TOKENS.labels("prefix").inc(prefix_tokens)
+    PROMPT_TOKENS.labels("request").inc(user_tokens)
+    logging.info(
+        f"[PROMPT] v{PROMPT_VERSION}{' custom' if exemplar else ''} exemplar {step:.0%}: "
+        f"~{prefix_tokens + user_tokens} input tokens, ~{prefix_tokens} in the cacheable prefix"
     )
 
-    response_text = response.choices[0].message.content
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
 
+def parse_new_terms(section: str) -> Dict[str, str]:
+    """Parse "chinese:english" lines of the NEW_TERMS section."""
+    new_terms: Dict[str, str] = {}
+    for line in section.splitlines():
+        line = line.strip()
+        if line and ":" in line:
+            chinese, english = map(str.strip, line.split(":", 1))
+            if chinese and english:
+                new_terms[chinese] = english
+    return new_terms
+
+def parse_translation_response(response_text: str, chapter_name: str):
+    """Split a completion into chapter title, translation and new glossary terms."""
     # extract chapter title, translation and terms
     chapter_title_match = re.search(
         r"CHAPTER_TITLE:\s*(.*?)(?=TRANSLATION:|$)", response_text, re.DOTALL
@@ -374,116 +1961,1035 @@ Please translate both the chapter title and content."""
     translation = (
         translation_match.group(1).strip() if translation_match else response_text
     )
-    new_terms: Dict[str, str] = {}
+    new_terms = parse_new_terms(new_terms_match.group(1)) if new_terms_match else {}
 
-    if new_terms_match:
-        for line in new_terms_match.group(1).splitlines():
-            line = line.strip()
-            if line and ":" in line:
-                chinese, english = map(str.strip, line.split(":", 1))
-                if chinese and english:
-                    new_terms[chinese] = english
+    return chapter_title, translation, new_terms
+
+
+class TranslationStreamParser:
+    """Incremental counterpart of parse_translation_response for streamed completions.
+
+    feed() takes raw completion deltas and returns ("title" | "translation", text)
+    pieces as soon as they are known not to be part of a section marker.
+    """
+
+    HOLDBACK = max(len(m) for m in TRANSLATION_MARKERS) - 1
+
+    def __init__(self):
+        self.section = None  # None (preamble), "title", "translation" or "terms"
+        self.buffer = ""
+        self.started = False  # leading whitespace of the section already skipped
+        self.terms_text = ""
 
+    def _next_markers(self):
+        if self.section is None:
+            return {"CHAPTER_TITLE:": "title", "TRANSLATION:": "translation", "NEW_TERMS:": "terms"}
+        if self.section == "title":
+            return {"TRANSLATION:": "translation", "NEW_TERMS:": "terms"}
+        if self.section == "translation":
+            return {"NEW_TERMS:": "terms"}
+        return {}
+
+    def _emit(self, events, text):
+        if not self.started:
+            text = text.lstrip()
+            self.started = bool(text)
+        if text and self.section in ("title", "translation"):
+            events.append((self.section, text))
+
+    def feed(self, delta: str):
+        events = []
+        self.buffer += delta
+        while True:
+            if self.section == "terms":
+                self.terms_text += self.buffer
+                self.buffer = ""
+                return events
+
+            markers = self._next_markers()
+            found = [(self.buffer.find(m), m) for m in markers if m in self.buffer]
+            if found:
+                index, marker = min(found)
+                if self.section is not None:
+                    self._emit(events, self.buffer[:index].rstrip())
+                self.section = markers[marker]
+                self.started = False
+                self.buffer = self.buffer[index + len(marker):]
+                continue
+
+            if self.section is None:
+                # no section yet; keep everything for the no-marker fallback
+                return events
+            safe = self.buffer[:max(0, len(self.buffer) - self.HOLDBACK)].rstrip()
+            self._emit(events, safe)
+            self.buffer = self.buffer[len(safe):]
+            return events
+
+    def finish(self):
+        """Flush what is left once the completion has ended."""
+        events = []
+        if self.section is None:
+            # no markers at all: /translate falls back to the raw text as translation
+            self.section = "translation"
+            self.started = False
+        if self.section == "terms":
+            self.terms_text += self.buffer
+        else:
+            self._emit(events, self.buffer.rstrip())
+        self.buffer = ""
+        return events
+
+async def translate_text_openrouter(text: str, chapter_name: str, glossary: Dict[str, str],
+                                   exemplar: Optional[str] = None):
+    """Translate Chinese text and chapter name to English through the LLM routes."""
+    response_text, _ = await llm_router.complete(
+        build_translation_messages(text, chapter_name, glossary, exemplar=exemplar)
+    )
+    return parse_translation_response(response_text, chapter_name)
+
+def split_translation_chunks(text: str, max_tokens: Optional[int] = None) -> List[str]:
+    """Group paragraphs into chunks of at most max_tokens (estimated) each.
+
+    A single paragraph over the budget is split at sentence ends instead.
+    """
+    max_tokens = max_tokens or TRANSLATION_CHUNK_TOKENS
+    pieces = []
+    for paragraph in text.split('\n'):
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        sentence = ""
+        for part in re.split(r'(?<=[。！？!?])', paragraph):
+            if sentence and estimate_tokens(sentence + part) > max_tokens:
+                pieces.append(sentence)
+                sentence = ""
+            sentence += part
+        if sentence:
+            pieces.append(sentence)
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for piece in pieces:
+        piece_tokens = estimate_tokens(piece) + 1
+        if current and current_tokens + piece_tokens > max_tokens:
+            chunks.append('\n'.join(current))
+            current = []
+            current_tokens = 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks
+
+async def translate_chunk_openrouter(chunk: str, chapter_name: str, glossary: Dict[str, str], part,
+                                    exemplar: Optional[str] = None):
+    """Translate one chunk, asking again while the reply comes back truncated or without a translation.
+
+    Upstream errors are retried and failed over by the router, so they are raised as they come.
+    """
+    messages = build_translation_messages(chunk, chapter_name, glossary, part=part, exemplar=exemplar)
+
+    for attempt in range(1, TRANSLATION_CHUNK_MAX_ATTEMPTS + 1):
+        response_text, finish_reason = await llm_router.complete(messages)
+        if finish_reason == "length":
+            problem = "completion was truncated"
+        elif "TRANSLATION:" not in response_text:
+            problem = "completion has no TRANSLATION section"
+        else:
+            return parse_translation_response(response_text, chapter_name)
+        if attempt == TRANSLATION_CHUNK_MAX_ATTEMPTS:
+            raise RuntimeError(f"chunk {part[0] + 1}/{part[1]} failed after {attempt} attempts: {problem}")
+        logging.info(f"[TRANSLATE] Chunk {part[0] + 1}/{part[1]} attempt {attempt} failed: {problem}")
+        await asyncio.sleep(TRANSLATION_CHUNK_RETRY_BACKOFF * 2 ** (attempt - 1))
+
+async def translate_text_chunked(text: str, chapter_name: str, glossary: Dict[str, str],
+                                 exemplar: Optional[str] = None):
+    """Translate a long chapter as concurrent paragraph chunks and stitch the results."""
+    chunks = split_translation_chunks(text)
+    if len(chunks) == 1:
+        return await translate_text_openrouter(text, chapter_name, glossary, exemplar=exemplar)
+
+    logging.info(f"[TRANSLATE] Translating {len(chunks)} chunks of chapter: {chapter_name}")
+    chunk_limit = asyncio.Semaphore(TRANSLATION_CHUNK_CONCURRENCY)
+
+    async def translate_part(index: int, chunk: str):
+        async with chunk_limit:
+            return await translate_chunk_openrouter(chunk, chapter_name, glossary, (index, len(chunks)), exemplar)
+
+    tasks = [asyncio.create_task(translate_part(i, c)) for i, c in enumerate(chunks)]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        # one failed chunk fails the chapter: stop the rest so they give back their LLM slots
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    chapter_title = results[0][0]
+    translation = "\n\n".join(r[1] for r in results)
+    new_terms: Dict[str, str] = {}
+    for _, _, chunk_terms in results:
+        for chinese, english in chunk_terms.items():
+            # the first chunk to name a term wins
+            new_terms.setdefault(chinese, english)
     return chapter_title, translation, new_terms
 
+async def stream_translation_openrouter(text: str, chapter_name: str, glossary: Dict[str, str],
+                                       exemplar: Optional[str] = None):
+    """Yield completion deltas for a translation as the model produces them."""
+    async for delta in llm_router.stream(build_translation_messages(text, chapter_name, glossary, exemplar=exemplar)):
+        yield delta
+
+# -----------------------------
+# TRANSLATION CACHE
+# -----------------------------
+def translation_cache_key(text: str, chapter_name: str, model: str, glossary: Dict[str, str],
+                          exemplar: Optional[str] = None) -> str:
+    """Content address of a translation: source, title, model, prompt version, glossary and custom exemplar used."""
+    material = [text, chapter_name, model, PROMPT_VERSION, sorted(glossary.items())]
+    exemplar = exemplar or TRANSLATION_STYLE_EXEMPLAR
+    if exemplar != BUILTIN_STYLE_EXEMPLAR:
+        # per-novel and PROMPT_EXEMPLAR_FILE exemplars are part of the key; the built-in one
+        # is covered by PROMPT_VERSION, so default-prompt entries keep their old address
+        material.append(hashlib.sha256(exemplar.encode('utf-8')).hexdigest())
+    material = json.dumps(material, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+async def ensure_translation_cache_indexes():
+    """TTL index that lets MongoDB evict old cached translations."""
+    try:
+        await db.translation_cache.create_index("created_at", expireAfterSeconds=TRANSLATION_CACHE_TTL)
+    except Exception as e:
+        logging.error(f"[CACHE] Could not create indexes: {e}")
+
+
+class TranslationCache:
+    """In-process LRU in front of the translation_cache collection."""
+
+    def __init__(self, size: int = TRANSLATION_CACHE_SIZE, ttl: int = TRANSLATION_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def _remember(self, key: str, value: Dict[str, Any]):
+        self._entries[key] = (time.time() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.time():
+            self._entries.move_to_end(key)
+            return entry[1]
+        if entry:
+            del self._entries[key]
+
+        try:
+            with stage_timer("cache_read"):
+                doc = await db.translation_cache.find_one({"_id": key})
+        except Exception as e:
+            logging.error(f"[CACHE] Lookup failed: {e}")
+            return None
+        if not doc:
+            return None
+        value = {
+            "chapter_title": doc["chapter_title"],
+            "translation": doc["translation"],
+            "new_terms": dict(doc.get("new_terms", [])),
+        }
+        self._remember(key, value)
+        return value
+
+    async def put(self, key: str, value: Dict[str, Any], model: str):
+        self._remember(key, value)
+        try:
+            with stage_timer("cache_write"):
+                await db.translation_cache.replace_one(
+                    {"_id": key},
+                    {
+                        "chapter_title": value["chapter_title"],
+                        "translation": value["translation"],
+                        # pairs, since glossary keys are not safe MongoDB field names
+                        "new_terms": list(value["new_terms"].items()),
+                        "model": model,
+                        "prompt_version": PROMPT_VERSION,
+                        "created_at": datetime.now(timezone.utc),
+                    },
+                    upsert=True,
+                )
+        except Exception as e:
+            logging.error(f"[CACHE] Store failed: {e}")
+
+
+translation_cache = TranslationCache()
+
+
+class BatchExtractRequest(BaseModel):
+    urls: Optional[List[str]] = None
+    novel_url: Optional[str] = None
+    start: Optional[int] = None
+    end: Optional[int] = None
+
+class CatalogCheck(BaseModel):
+    url: str
+    since: Optional[int] = None
+    catalog_hash: Optional[str] = None
+
+class UpdateCheckRequest(BaseModel):
+    novels: List[CatalogCheck]
+
+class JobRequest(BaseModel):
+    novel_url: str
+    start: Optional[int] = None
+    end: Optional[int] = None
+
 class TranslateRequest(BaseModel):
     text: str
     chapter_name: str
     novel_id: str
+    use_cache: bool = True
+    refresh_cache: bool = False
+    # None splits only chapters over TRANSLATION_CHUNK_TOKENS; /translate/stream never splits
+    chunked: Optional[bool] = None
 
 
+# shared by /translate and /translate/stream
+async def prepare_translation(payload: TranslateRequest) -> Dict[str, Any]:
+    """Validate a translate request and resolve its glossary and cache entry."""
+    text = payload.text.strip()
+    chapter_name = payload.chapter_name.strip()
+    novel_id = payload.novel_id.strip()
 
+    if not text:
+        raise HTTPException(status_code=400, detail="Text cannot be empty")
+    if not chapter_name:
+        raise HTTPException(status_code=400, detail="Chapter name cannot be empty")
+    if not novel_id:
+        raise HTTPException(status_code=400, detail="Novel ID cannot be empty")
 
-# configure logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    glossary = await get_novel_glossary(novel_id)
+    prompt_glossary = relevant_glossary_terms(novel_id, glossary, text, chapter_name)
+    exemplar = novel_exemplars.get(novel_id)
+    cache_key = translation_cache_key(text, chapter_name, TRANSLATION_CACHE_MODEL, prompt_glossary, exemplar)
+    cached = None
+    if payload.use_cache and not payload.refresh_cache:
+        cached = await translation_cache.get(cache_key)
+    if cached:
+        logging.info(f"[TRANSLATE] Cache hit for Novel ID: {novel_id}, Chapter: {chapter_name}")
 
-# routes
-@app.get("/scrape")
-def scrape(url: str = Query(..., description="Novel URL (e.g., https://twkan.com/book/79291)")):
-    logging.info(f"[SCRAPE] Started scraping for URL: {url}")
-    url = url.rstrip('/')
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)  # headless for API
-        page = browser.new_page()
+    return {
+        "text": text,
+        "chapter_name": chapter_name,
+        "novel_id": novel_id,
+        "glossary": glossary,
+        "prompt_glossary": prompt_glossary,
+        "exemplar": exemplar,
+        "cache_key": cache_key,
+        "cached": cached,
+        # filled in by the router with the models that produced the translation
+        "models": set()
+    }
+
+async def finish_translation(payload: TranslateRequest, request: Dict[str, Any],
+                       chapter_title: str, translation: str, new_terms: Dict[str, str]) -> Dict[str, Any]:
+    """Cache a fresh translation, merge its new terms and build the response summary."""
+    novel_id = request["novel_id"]
+    cached = request["cached"]
+    glossary = request["glossary"]
+    added = 0
+    # a cache hit replays terms the original translation already merged, and terms
+    # the glossary already holds with the same value would only bump its version
+    changed_terms = {} if cached else {k: v for k, v in new_terms.items() if glossary.get(k) != v}
+    if changed_terms:
+        updated = await update_novel_glossary(novel_id, changed_terms)
+        if updated is not None:
+            glossary, added = updated
+
+    if not cached and payload.use_cache:
+        entry = {
+            "chapter_title": chapter_title,
+            "translation": translation,
+            "new_terms": new_terms
+        }
+        model = ",".join(sorted(request["models"])) or TRANSLATION_CACHE_MODEL
+        await translation_cache.put(request["cache_key"], entry, model)
+        # the merged terms occur in the text, so a repeat of this request looks up a key
+        # built from the updated glossary; store the entry under that address as well
+        repeat_glossary = relevant_glossary_terms(novel_id, glossary, request["text"], request["chapter_name"])
+        repeat_key = translation_cache_key(
+            request["text"], request["chapter_name"], TRANSLATION_CACHE_MODEL, repeat_glossary, request["exemplar"]
+        )
+        if repeat_key != request["cache_key"]:
+            await translation_cache.put(repeat_key, entry, model)
+
+    logging.info(f"[TRANSLATE] Completed translation for Novel ID: {novel_id}, Chapter: {request['chapter_name']} (Added {added} new terms)")
+
+    return {
+        "chapter_title": chapter_title,
+        "translation": translation,
+        "new_terms": new_terms,
+        "glossary": glossary,
+        "terms_added": added,
+        "cached": cached is not None
+    }
+
+
+
+
+async def translate_chapter(payload: TranslateRequest) -> Dict[str, Any]:
+    """Translate one chapter end to end: glossary, cache, LLM and glossary merge."""
+    return await translate_prepared(payload, await prepare_translation(payload))
+
+async def translate_prepared(payload: TranslateRequest, request: Dict[str, Any],
+                             gate: Optional[AdmissionGate] = None) -> Dict[str, Any]:
+    """Run the LLM part of a prepared translation, optionally behind an admission gate."""
+    cached = request["cached"]
+    if cached:
+        chapter_title, translation, new_terms = cached["chapter_title"], cached["translation"], cached["new_terms"]
+    else:
+        if gate:
+            async with gate.admit():
+                return await translate_prepared(payload, request)
+        chunked = payload.chunked
+        if chunked is None:
+            chunked = estimate_tokens(request["text"]) > TRANSLATION_CHUNK_TOKENS
+        translate = translate_text_chunked if chunked else translate_text_openrouter
+        llm_models_var.set(request["models"])
         try:
-            page.goto(url, wait_until='domcontentloaded')
-            novel_details = get_novel_details(page, url)
-            if not novel_details:
-                logging.info(f"[SCRAPE] Failed for URL: {url}")
-                return JSONResponse(content={"error": "Failed to extract novel details"}, status_code=400)
-
-            clean_base_url = url[:-5] if url.endswith('.html') else url
-            index_url = clean_base_url + "/index.html"
-            chapters = crawl_chapters(page, index_url)
-
-            if not chapters:
-                logging.info(f"[SCRAPE] Failed (no chapters) for URL: {url}")
-                return JSONResponse(content={"error": "Failed to crawl chapters"}, status_code=400)
-
-            result = {
-                'title': novel_details['title'],
-                'author': novel_details['author'],
-                'coverImg': novel_details['coverImg'],
-                'chapters': chapters
+            chapter_title, translation, new_terms = await translate(
+                request["text"], request["chapter_name"], request["prompt_glossary"], exemplar=request["exemplar"]
+            )
+        except LLMBusyError as e:
+            # an admitted request can still need more upstream slots than are free (chunks, hedges,
+            # jobs outside the gate); that is saturation too, so answer like the gate does
+            logging.info(f"[TRANSLATE] Rejected for Novel ID: {request['novel_id']}: {e}")
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(llm_gate.retry_after())})
+        except RuntimeError as e:
+            logging.error(f"[TRANSLATE] Failed for Novel ID: {request['novel_id']}: {e}")
+            raise HTTPException(status_code=502, detail=str(e))
+
+    return await finish_translation(payload, request, chapter_title, translation, new_terms)
+
+
+# -----------------------------
+# PIPELINE JOBS
+# -----------------------------
+JOB_EXTRACT_WORKERS = int(os.getenv("JOB_EXTRACT_WORKERS", str(BROWSER_POOL_SIZE)))
+JOB_TRANSLATE_WORKERS = int(os.getenv("JOB_TRANSLATE_WORKERS", "2"))
+# how many chapters extraction may run ahead of translation within one job
+JOB_EXTRACT_AHEAD = int(os.getenv("JOB_EXTRACT_AHEAD", "20"))
+
+JOB_ACTIVE_STATES = ("queued", "running")
+
+
+async def ensure_job_indexes():
+    """Indexes for job lookups and per-chapter progress (idempotent)."""
+    try:
+        await db.jobs.create_index([("novel_id", 1), ("created_at", -1)])
+        await db.job_chapters.create_index([("job_id", 1), ("chapter_number", 1)], unique=True)
+        await db.job_chapters.create_index([("job_id", 1), ("num", 1)])
+    except Exception as e:
+        logging.error(f"[JOBS] Could not create indexes: {e}")
+
+
+class JobManager:
+    """Runs scrape -> extract -> translate pipelines with per-chapter progress in MongoDB.
+
+    Extraction and translation draw on separate worker pools shared by all jobs,
+    so browser-bound and LLM-bound work overlap. Within a job, chapters are
+    translated strictly in chapter order so terms found early reach later chapters.
+    """
+
+    def __init__(self, extract_workers: int = JOB_EXTRACT_WORKERS,
+                 translate_workers: int = JOB_TRANSLATE_WORKERS, extract_ahead: int = JOB_EXTRACT_AHEAD):
+        self.extract_limit = asyncio.Semaphore(extract_workers)
+        self.translate_limit = asyncio.Semaphore(translate_workers)
+        self.extract_ahead = extract_ahead
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self._create_lock = asyncio.Lock()
+
+    async def create(self, novel_id: str, payload: JobRequest) -> Dict[str, Any]:
+        # one active job per novel: two would translate the same chapters and interleave glossary writes
+        async with self._create_lock:
+            active = await db.jobs.find_one(
+                {"novel_id": novel_id, "status": {"$in": list(JOB_ACTIVE_STATES)}}, {"_id": 1}
+            )
+            if active:
+                raise HTTPException(status_code=409, detail=f"Novel already has an active job: {active['_id']}")
+            now = datetime.now(timezone.utc)
+            job = {
+                "novel_id": novel_id,
+                "novel_url": payload.novel_url.rstrip('/'),
+                "start": payload.start,
+                "end": payload.end,
+                "status": "queued",
+                "error": None,
+                "created_at": now,
+                "updated_at": now,
             }
+            result = await db.jobs.insert_one(job)
+        job_id = str(result.inserted_id)
+        self.start(job_id)
+        return await self.status(job_id)
+
+    async def belongs_to(self, job_id: str, novel_id: str) -> bool:
+        return await db.jobs.find_one({"_id": ObjectId(job_id), "novel_id": novel_id}, {"_id": 1}) is not None
+
+    def start(self, job_id: str):
+        if job_id in self.tasks and not self.tasks[job_id].done():
+            return
+        # a fresh context, so the job does not carry the trace id and timings of the request that started it
+        task = asyncio.create_task(self._run(job_id), context=Context())
+        self.tasks[job_id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(job_id, None))
+
+    async def resume(self):
+        """Restart jobs that were queued or running when the process stopped."""
+        try:
+            async for job in db.jobs.find({"status": {"$in": list(JOB_ACTIVE_STATES)}}, {"_id": 1}):
+                logging.info(f"[JOBS] Resuming job {job['_id']}")
+                self.start(str(job["_id"]))
+        except Exception as e:
+            logging.error(f"[JOBS] Could not resume jobs: {e}")
+
+    async def stop(self):
+        """Stop workers on shutdown; their jobs stay 'running' and resume on next start."""
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def cancel(self, job_id: str) -> bool:
+        result = await db.jobs.update_one(
+            {"_id": ObjectId(job_id), "status": {"$in": list(JOB_ACTIVE_STATES)}},
+            {"$set": {"status": "cancelled", "updated_at": datetime.now(timezone.utc)}}
+        )
+        task = self.tasks.get(job_id)
+        if task:
+            task.cancel()
+        return result.modified_count > 0
 
-            logging.info(f"[SCRAPE] Completed for URL: {url}")
-            return JSONResponse(content=result, status_code=200)
+    async def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = await db.jobs.find_one({"_id": ObjectId(job_id)})
+        if not job:
+            return None
+        counts = {"pending": 0, "extracted": 0, "translated": 0, "failed": 0}
+        async for row in await db.job_chapters.aggregate([
+            {"$match": {"job_id": job_id}},
+            {"$group": {"_id": "$state", "count": {"$sum": 1}}}
+        ]):
+            counts[row["_id"]] = row["count"]
+        return {
+            "job_id": job_id,
+            "novel_id": job["novel_id"],
+            "novel_url": job["novel_url"],
+            "status": job["status"],
+            "error": job.get("error"),
+            "chapters": counts,
+            "total_chapters": sum(counts.values()),
+            "created_at": job["created_at"].isoformat(),
+            "updated_at": job["updated_at"].isoformat(),
+        }
+
+    async def _set_status(self, job_id: str, status: str, error: Optional[str] = None):
+        await db.jobs.update_one(
+            {"_id": ObjectId(job_id)},
+            {"$set": {"status": status, "error": error, "updated_at": datetime.now(timezone.utc)}}
+        )
 
+    async def _update_chapter(self, job_id: str, chapter_number: str, fields: Dict[str, Any]):
+        fields["updated_at"] = datetime.now(timezone.utc)
+        await db.job_chapters.update_one({"job_id": job_id, "chapter_number": chapter_number}, {"$set": fields})
+
+    async def _scrape(self, job_id: str, job: Dict[str, Any]):
+        """Stage 1: resolve the chapter list once and persist it as pending chapters."""
+        if await db.job_chapters.count_documents({"job_id": job_id}, limit=1):
+            return
+        novel = await scrape_novel(job["novel_url"])
+        chapters = [
+            c for c in novel['chapters']
+            if chapter_in_range(c['chapter_number'], job.get("start"), job.get("end"))
+        ]
+        if not chapters:
+            raise ScrapeError("No chapters in the requested range")
+        now = datetime.now(timezone.utc)
+        await db.job_chapters.bulk_write([
+            UpdateOne(
+                {"job_id": job_id, "chapter_number": c['chapter_number']},
+                {"$setOnInsert": {
+                    "num": int(c['chapter_number']),
+                    "chapter_name": c['chapter_name'],
+                    "url": c['url'],
+                    "state": "pending",
+                    "updated_at": now,
+                }},
+                upsert=True,
+            )
+            for c in chapters
+        ], ordered=False)
+        logging.info(f"[JOBS] Job {job_id}: {len(chapters)} chapters queued")
+
+    async def _extract(self, job_id: str, chapter: Dict[str, Any], window: asyncio.Semaphore):
+        """Stage 2: fetch one chapter's text on the shared extraction pool."""
+        await window.acquire()
+        async with self.extract_limit:
+            result = await extract_chapter_with_retry(
+                {'chapter_number': chapter['chapter_number'], 'chapter_name': chapter['chapter_name'], 'url': chapter['url']}
+            )
+        if result['success']:
+            chapter['content'] = result['content']
+            chapter['state'] = "extracted"
+            await self._update_chapter(job_id, chapter['chapter_number'], {"state": "extracted", "content": result['content']})
+        else:
+            chapter['state'] = "failed"
+            await self._update_chapter(job_id, chapter['chapter_number'], {"state": "failed", "error": result['error']})
+
+    async def _translate(self, job_id: str, novel_id: str, chapter: Dict[str, Any]):
+        """Stage 3: translate one extracted chapter on the shared translation pool."""
+        async with self.translate_limit:
+            while True:
+                try:
+                    summary = await translate_chapter(TranslateRequest(
+                        text=chapter['content'], chapter_name=chapter['chapter_name'], novel_id=novel_id
+                    ))
+                    break
+                except HTTPException as e:
+                    if e.status_code == 429:
+                        # no LLM slot free: not the chapter's fault, so wait instead of leaving a hole
+                        logging.info(f"[JOBS] Job {job_id}: LLM busy, retrying chapter {chapter['chapter_number']}")
+                        await asyncio.sleep(int(e.headers["Retry-After"]))
+                        continue
+                    error = e.detail
+                except Exception as e:
+                    error = str(e)
+                await self._update_chapter(job_id, chapter['chapter_number'], {"state": "failed", "error": error})
+                return
+        await self._update_chapter(job_id, chapter['chapter_number'], {
+            "state": "translated",
+            "chapter_title": summary["chapter_title"],
+            "translation": summary["translation"],
+            "error": None,
+        })
+
+    async def _run(self, job_id: str):
+        job = await db.jobs.find_one({"_id": ObjectId(job_id)})
+        if not job or job["status"] not in JOB_ACTIVE_STATES:
+            return
+        await self._set_status(job_id, "running")
+        logging.info(f"[JOBS] Job {job_id} running for novel {job['novel_id']}")
+
+        extractions = []
+        try:
+            await self._scrape(job_id, job)
+
+            chapters = [
+                c async for c in db.job_chapters.find(
+                    {"job_id": job_id, "state": {"$ne": "translated"}},
+                    {"_id": 0, "chapter_number": 1, "num": 1, "chapter_name": 1, "url": 1, "state": 1, "content": 1}
+                ).sort("num", 1)
+            ]
+
+            # extraction runs ahead of translation by at most extract_ahead chapters
+            window = asyncio.Semaphore(self.extract_ahead)
+            ready = {}
+            for chapter in chapters:
+                if chapter['state'] == "failed":
+                    # retried when the job runs again, from the last stage that succeeded
+                    chapter['state'] = "extracted" if chapter.get('content') else "pending"
+                if chapter['state'] == "pending":
+                    ready[chapter['chapter_number']] = asyncio.create_task(self._extract(job_id, chapter, window))
+                    extractions.append(ready[chapter['chapter_number']])
+
+            for chapter in chapters:
+                extraction = ready.get(chapter['chapter_number'])
+                if extraction:
+                    await extraction
+                    window.release()
+                if chapter['state'] == "extracted":
+                    await self._translate(job_id, job['novel_id'], chapter)
+                chapter.pop('content', None)
+
+            await self._set_status(job_id, "completed")
+            logging.info(f"[JOBS] Job {job_id} completed")
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            logging.error(f"[SCRAPE] Error for URL {url}: {e}")
-            return JSONResponse(content={"error": str(e)}, status_code=500)
+            logging.error(f"[JOBS] Job {job_id} failed: {e}")
+            await self._set_status(job_id, "failed", str(e))
         finally:
-            browser.close()
+            for task in extractions:
+                task.cancel()
+
+
+job_manager = JobManager()
+
+
+# configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - " + ("[%(trace_id)s] " if LOG_TRACE_IDS else "") + "%(message)s",
+)
+for handler in logging.getLogger().handlers:
+    handler.addFilter(TraceIdFilter())
+
+# routes
+def ndjson_line(data: Dict[str, Any]) -> str:
+    return json.dumps(data, ensure_ascii=False) + "\n"
+
+
+async def stream_scrape(url: str, since: Optional[int]):
+    """NDJSON lines: the novel details, chapter batches as the catalog loads, then a summary"""
+    novel = None
+    chapters = []
+    try:
+        async for kind, data in stream_novel(url):
+            if kind == "novel":
+                novel = data
+                yield ndjson_line({"type": "novel", **data})
+                continue
+            chapters.extend(data)
+            if since is not None:
+                data = [c for c in data if chapter_in_range(c['chapter_number'], since + 1, None)]
+            for i in range(0, len(data), SCRAPE_STREAM_BATCH):
+                yield ndjson_line({"type": "chapters", "chapters": data[i:i + SCRAPE_STREAM_BATCH]})
+    except ScrapeError as e:
+        logging.info(f"[SCRAPE] Failed for URL: {url} ({e})")
+        yield ndjson_line({"type": "error", "error": str(e)})
+        return
+    except Exception as e:
+        logging.error(f"[SCRAPE] Error for URL {url}: {e}")
+        yield ndjson_line({"type": "error", "error": str(e)})
+        return
+
+    # stored once complete, so the pages of /scrape?limit= are served from it
+    novel["chapters"] = chapters
+    try:
+        sync = await sync_catalog(url, novel)
+        catalog_hash = sync["catalog_hash"]
+    except Exception as e:
+        logging.error(f"[CATALOG] Sync failed for {url}: {e}")
+        catalog_hash = compute_catalog_hash(chapters)
+
+    logging.info(f"[SCRAPE] Streamed {len(chapters)} chapters for URL: {url}")
+    yield ndjson_line({"type": "done", "catalog_hash": catalog_hash, "total_chapters": len(chapters)})
+
+
+@app.get("/scrape")
+async def scrape(
+    request: Request,
+    url: str = Query(..., description="Novel URL (e.g., https://twkan.com/book/79291)"),
+    since: Optional[int] = Query(None, description="Only return chapters with a higher data-num"),
+    catalog_hash: Optional[str] = Query(None, description="catalog_hash from a previous response"),
+    stream: bool = Query(False, description="Stream NDJSON lines as the catalog loads (also Accept: application/x-ndjson)"),
+    offset: int = Query(0, ge=0, description="First chapter of the page"),
+    limit: Optional[int] = Query(None, ge=1, le=SCRAPE_PAGE_MAX, description="Page size; pages come from the stored catalog"),
+):
+    logging.info(f"[SCRAPE] Started scraping for URL: {url}")
+    url = url.rstrip('/')
+    if_none_match = request.headers.get("if-none-match", "").strip('"') or None
+
+    if stream or "application/x-ndjson" in request.headers.get("accept", ""):
+        return StreamingResponse(stream_scrape(url, since), media_type="application/x-ndjson")
+
+    if limit is not None:
+        # later pages are read from the catalog stored by an earlier scrape, without a browser
+        page = await stored_catalog_page(url, offset, limit, since)
+        if page is not None:
+            headers = {"ETag": f'"{page["catalog_hash"]}"'}
+            if if_none_match == page["catalog_hash"]:
+                return Response(status_code=304, headers=headers)
+            page.update({
+                "offset": offset,
+                "limit": limit,
+                "next_offset": offset + limit if offset + limit < page["total"] else None,
+                "incremental": since is not None,
+                "stored": True,
+            })
+            logging.info(f"[SCRAPE] Served page {offset}+{limit} of stored catalog for URL: {url}")
+            return JSONResponse(content=page, status_code=200, headers=headers)
+
+    try:
+        novel, sync, selected = await sync_novel_catalog(url, since, catalog_hash or if_none_match)
+    except ScrapeError as e:
+        logging.info(f"[SCRAPE] Failed for URL: {url} ({e})")
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    except Exception as e:
+        logging.error(f"[SCRAPE] Error for URL {url}: {e}")
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+    current_hash = sync["catalog_hash"] if sync else compute_catalog_hash(novel['chapters'])
+    headers = {"ETag": f'"{current_hash}"'}
+    if if_none_match == current_hash:
+        logging.info(f"[SCRAPE] Not modified for URL: {url}")
+        return Response(status_code=304, headers=headers)
+
+    result = {
+        'title': novel['title'],
+        'author': novel['author'],
+        'coverImg': novel['coverImg'],
+        'chapters': novel['chapters'] if selected is None else selected,
+        'catalog_hash': current_hash,
+        'total_chapters': len(novel['chapters']),
+        'incremental': selected is not None
+    }
+    if limit is not None:
+        total = len(result['chapters'])
+        result.update({
+            'chapters': result['chapters'][offset:offset + limit],
+            'total': total,
+            'offset': offset,
+            'limit': limit,
+            'next_offset': offset + limit if offset + limit < total else None,
+        })
+
+    logging.info(f"[SCRAPE] Completed for URL: {url} ({len(result['chapters'])} chapters returned)")
+    return JSONResponse(content=result, status_code=200, headers=headers)
+
+
+@app.post("/scrape/updates")
+async def check_updates(payload: UpdateCheckRequest = Body(...)):
+    logging.info(f"[UPDATES] Checking {len(payload.novels)} novels")
+    limit = asyncio.Semaphore(SCRAPE_UPDATES_CONCURRENCY)
+
+    async def check(novel: CatalogCheck) -> Dict[str, Any]:
+        url = novel.url.rstrip('/')
+        async with limit:
+            try:
+                details, sync, selected = await sync_novel_catalog(url, novel.since, novel.catalog_hash)
+            except Exception as e:
+                return {'url': url, 'has_updates': False, 'error': str(e)}
+        # without a client reference point, "new" means new since our last sync
+        if selected is None:
+            selected = sync["changed"] if sync else []
+        return {
+            'url': url,
+            'title': details['title'],
+            'has_updates': bool(selected),
+            'new_chapters': selected,
+            'catalog_hash': sync["catalog_hash"] if sync else compute_catalog_hash(details['chapters']),
+            'total_chapters': len(details['chapters'])
+        }
+
+    results = await asyncio.gather(*(check(n) for n in payload.novels))
+    updated = [r['url'] for r in results if r['has_updates']]
+    logging.info(f"[UPDATES] {len(updated)}/{len(results)} novels have new chapters")
+    return {'checked': len(results), 'updated': updated, 'results': results}
 
 
 @app.get("/extract")
-def extract(url: str = Query(..., description="Chapter URL"), headless: bool = True):
+async def extract(url: str = Query(..., description="Chapter URL"), headless: bool = True):
     logging.info(f"[EXTRACT] Started extraction for: {url}")
+
     try:
-        content = extract_single_chapter(url, headless=headless)
+        # readers racing for a freshly released chapter share one fetch
+        content = await extract_flight.do(
+            f"{headless}:{url}", lambda: extract_single_chapter(url, headless=headless, gate=browser_gate)
+        )
         if content:
             logging.info(f"[EXTRACT] Completed successfully for: {url}")
             return JSONResponse(content={"success": True, "content": content})
         else:
             logging.info(f"[EXTRACT] Failed (no content) for: {url}")
             return JSONResponse(content={"success": False, "error": "Failed to extract content"}, status_code=400)
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"[EXTRACT] Error for URL {url}: {e}")
         return JSONResponse(content={"success": False, "error": str(e)}, status_code=500)
 
 
-@app.post("/translate")
-def translate_endpoint(payload: TranslateRequest = Body(...)) -> Dict[str, Any]:
-    logging.info(f"[TRANSLATE] Started translation for Novel ID: {payload.novel_id}, Chapter: {payload.chapter_name}")
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
-    text = payload.text.strip()
-    chapter_name = payload.chapter_name.strip()
-    novel_id = payload.novel_id.strip()
-    
-    if not text:
-        raise HTTPException(status_code=400, detail="Text cannot be empty")
-    if not chapter_name:
-        raise HTTPException(status_code=400, detail="Chapter name cannot be empty")
-    if not novel_id:
-        raise HTTPException(status_code=400, detail="Novel ID cannot be empty")
 
-    glossary = get_novel_glossary(novel_id)
-    chapter_title, translation, new_terms = translate_text_openrouter(text, chapter_name, glossary)
+@app.get("/extract/stats")
+async def extract_stats():
+    return {"fast_path": fetch_stats.snapshot(), "browser_pool": browser_pool.stats()}
 
-    added = 0
-    if new_terms:
-        success = update_novel_glossary(novel_id, new_terms)
-        if success:
-            added = len(new_terms)
-            glossary = get_novel_glossary(novel_id)
 
-    logging.info(f"[TRANSLATE] Completed translation for Novel ID: {novel_id}, Chapter: {chapter_name} (Added {added} new terms)")
+@app.get("/llm/stats")
+async def llm_stats():
+    return {"routes": llm_router.stats(), "hedge_after_seconds": LLM_HEDGE_AFTER}
 
+
+@app.get("/admission/stats")
+async def admission_stats():
     return {
-        "chapter_title": chapter_title,
-        "translation": translation,
-        "new_terms": new_terms,
-        "glossary": glossary,
-        "terms_added": added
+        "browser": browser_gate.stats(),
+        "llm": llm_gate.stats(),
+        "single_flight": {"extract": extract_flight.stats(), "translate": translate_flight.stats()},
     }
+
+
+@app.post("/extract/batch")
+async def extract_batch(payload: BatchExtractRequest = Body(...)):
+    if payload.urls:
+        chapters = [{'chapter_number': None, 'chapter_name': None, 'url': u} for u in payload.urls]
+    elif payload.novel_url:
+        try:
+            novel = await scrape_novel(payload.novel_url)
+        except ScrapeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        chapters = [
+            c for c in novel['chapters']
+            if chapter_in_range(c['chapter_number'], payload.start, payload.end)
+        ]
+    else:
+        raise HTTPException(status_code=400, detail="Either urls or novel_url is required")
+
+    if not chapters:
+        raise HTTPException(status_code=400, detail="No chapters to extract")
+
+    logging.info(f"[BATCH] Started extraction of {len(chapters)} chapters")
+
+    async def stream_results():
+        tasks = [asyncio.create_task(extract_chapter_with_retry(c)) for c in chapters]
+        succeeded = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if result['success']:
+                    succeeded += 1
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+            logging.info(f"[BATCH] Completed: {succeeded}/{len(chapters)} chapters extracted")
+            yield json.dumps({
+                'done': True,
+                'total': len(chapters),
+                'succeeded': succeeded,
+                'failed': len(chapters) - succeeded
+            }) + "\n"
+        finally:
+            # client went away: stop the remaining chapters
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+@app.post("/translate")
+async def translate_endpoint(payload: TranslateRequest = Body(...)) -> Dict[str, Any]:
+    logging.info(f"[TRANSLATE] Started translation for Novel ID: {payload.novel_id}, Chapter: {payload.chapter_name}")
+    request = await prepare_translation(payload)
+    if request["cached"]:
+        return await translate_prepared(payload, request)
+
+    # identical chapters submitted at the same time share one LLM call
+    flight_key = f"{request['novel_id']}:{request['cache_key']}:{payload.refresh_cache}:{payload.chunked}"
+    return await translate_flight.do(flight_key, lambda: translate_prepared(payload, request, gate=llm_gate))
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/translate/stream")
+async def translate_stream_endpoint(payload: TranslateRequest = Body(...)):
+    logging.info(f"[TRANSLATE] Started streaming translation for Novel ID: {payload.novel_id}, Chapter: {payload.chapter_name}")
+
+    # validation errors and a full queue still surface as plain 400/429s before the stream starts
+    request = await prepare_translation(payload)
+    if not request["cached"]:
+        llm_gate.check()
+
+    async def stream_translation():
+        parser = TranslationStreamParser()
+        response_parts = []
+        llm_models_var.set(request["models"])
+        try:
+            async for delta in stream_translation_openrouter(
+                request["text"], request["chapter_name"], request["prompt_glossary"], exemplar=request["exemplar"]
+            ):
+                response_parts.append(delta)
+                for section, piece in parser.feed(delta):
+                    yield sse_event(section, {"text": piece})
+            for section, piece in parser.finish():
+                yield sse_event(section, {"text": piece})
+        except LLMBusyError as e:
+            logging.info(f"[TRANSLATE] Rejected for Novel ID: {request['novel_id']}: {e}")
+            yield sse_event("error", {"error": str(e), "retry_after": str(llm_gate.retry_after())})
+            return
+        except Exception as e:
+            logging.error(f"[TRANSLATE] Stream error for Novel ID {request['novel_id']}: {e}")
+            yield sse_event("error", {"error": str(e)})
+            return
+
+        # NEW_TERMS is the last section, so it is complete once the stream ends
+        chapter_title, translation, new_terms = parse_translation_response(
+            "".join(response_parts), request["chapter_name"]
+        )
+        yield sse_event("done", await finish_translation(payload, request, chapter_title, translation, new_terms))
+
+    async def stream_events():
+        cached = request["cached"]
+        if cached:
+            yield sse_event("title", {"text": cached["chapter_title"]})
+            yield sse_event("translation", {"text": cached["translation"]})
+            yield sse_event("done", await finish_translation(
+                payload, request, cached["chapter_title"], cached["translation"], cached["new_terms"]
+            ))
+            return
+
+        # the slot is taken inside the stream so it is always released with it
+        try:
+            admitted_at = await llm_gate.acquire()
+        except HTTPException as e:
+            yield sse_event("error", {"error": e.detail, "retry_after": e.headers["Retry-After"]})
+            return
+        try:
+            async for event in stream_translation():
+                yield event
+        finally:
+            llm_gate.release(admitted_at)
+
+    return StreamingResponse(
+        stream_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/novels/{novel_id}/jobs")
+async def create_job(novel_id: str, payload: JobRequest = Body(...)):
+    if not ObjectId.is_valid(novel_id):
+        raise HTTPException(status_code=400, detail="Invalid novel ID")
+    logging.info(f"[JOBS] Creating job for Novel ID: {novel_id} ({payload.novel_url})")
+    return JSONResponse(content=await job_manager.create(novel_id, payload), status_code=202)
+
+
+@app.get("/novels/{novel_id}/jobs/{job_id}")
+async def get_job(novel_id: str, job_id: str):
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+    status = await job_manager.status(job_id)
+    if not status or status["novel_id"] != novel_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+
+@app.get("/novels/{novel_id}/jobs/{job_id}/chapters/{chapter_number}")
+async def get_job_chapter(novel_id: str, job_id: str, chapter_number: str):
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+    if not await job_manager.belongs_to(job_id, novel_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    chapter = await db.job_chapters.find_one({"job_id": job_id, "chapter_number": chapter_number}, {"_id": 0})
+    if not chapter:
+        raise HTTPException(status_code=404, detail="Chapter not found")
+    chapter["updated_at"] = chapter["updated_at"].isoformat()
+    return chapter
+
+
+@app.post("/novels/{novel_id}/jobs/{job_id}/cancel")
+async def cancel_job(novel_id: str, job_id: str):
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+    if not await job_manager.belongs_to(job_id, novel_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not await job_manager.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job is not running")
+    logging.info(f"[JOBS] Cancelled job {job_id}")
+    return await job_manager.status(job_id)
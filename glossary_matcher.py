@@ -0,0 +1,85 @@
+# glossary term matching
+#
+# Aho-Corasick automaton over the Chinese glossary keys of one novel: a single
+# scan of the chapter finds every key that occurs in it, no matter how many
+# thousands of terms the glossary has collected.
+
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+
+class GlossaryMatcher:
+    """Multi-pattern matcher that can grow as a novel's glossary does."""
+
+    def __init__(self, terms: Iterable[str] = ()):
+        self.terms: Set[str] = set()
+        self._goto: List[Dict[str, int]] = [{}]
+        self._terminal: List[str] = [None]
+        self._fail: List[int] = [0]
+        self._out: List[tuple] = [()]
+        self._dirty = False
+        self.add(terms)
+
+    def add(self, terms: Iterable[str]) -> int:
+        """Insert new terms into the trie; failure links are relinked on next use."""
+        added = 0
+        for term in terms:
+            if not term or term in self.terms:
+                continue
+            node = 0
+            for ch in term:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._terminal.append(None)
+                    self._fail.append(0)
+                    self._out.append(())
+                    self._goto[node][ch] = nxt
+                node = nxt
+            self._terminal[node] = term
+            self.terms.add(term)
+            added += 1
+        if added:
+            self._dirty = True
+        return added
+
+    def _link(self):
+        # breadth-first so every failure target is final before its dependants
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            self._out[child] = (self._terminal[child],) if self._terminal[child] else ()
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                own = (self._terminal[child],) if self._terminal[child] else ()
+                self._out[child] = own + self._out[self._fail[child]]
+                queue.append(child)
+
+        self._dirty = False
+
+    def find(self, text: str) -> Set[str]:
+        """Every term that occurs at least once in text."""
+        if not self.terms:
+            return set()
+        if self._dirty:
+            self._link()
+
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return found